@@ -138,6 +138,10 @@ class BrickerBrickify(bpy.types.Operator):
         source.cmlist_id = cm.id
         oldLayers = list(scn.layers)
         setLayers(source.layers)
+        # cached matrix can't be used if source geometry changed since it was computed
+        sourceHash = hash_object(source, transform=False) if source.type == "MESH" else ""
+        if "ANIM" not in self.action and cm.lastSourceHash not in ["", sourceHash]:
+            cm.matrixLost = True
         matrixDirty = matrixReallyIsDirty(cm)
         skipTransAndAnimData = cm.animated or (cm.splitModel or cm.lastSplitModel) and (matrixDirty or cm.buildIsDirty)
 
@@ -153,7 +157,7 @@ class BrickerBrickify(bpy.types.Operator):
 
         # make sure matrix really is dirty
         if cm.matrixIsDirty:
-            _, loadedFromCache = getBricksDict(dType="MODEL", cm=cm)
+            _, loadedFromCache = getBricksDict(dType="MODEL", cm=cm, readOnly=True)
             if not matrixDirty and loadedFromCache:
                 cm.matrixIsDirty = False
 
@@ -180,6 +184,7 @@ class BrickerBrickify(bpy.types.Operator):
         cm.lastShellThickness = cm.shellThickness
         cm.lastMatShellDepth = cm.matShellDepth
         cm.lastMatrixSettings = getMatrixSettings()
+        cm.lastSourceHash = sourceHash
         cm.lastIsSmoke = cm.isSmoke
         cm.materialIsDirty = False
         cm.modelIsDirty = False
@@ -252,8 +257,9 @@ class BrickerBrickify(bpy.types.Operator):
                 parent_clear(sourceDup)
             # send to new mesh
             sourceDup.data = self.source.to_mesh(scn, True, 'PREVIEW')
-            # apply transformation data
+            # apply transformation data (hashing the mesh first, so translated copies can share voxelizations)
             # TODO: rewrite the transform apply operator myself
+            store_unbaked_hash(sourceDup)
             apply_transform(sourceDup)
             scn.update()
         else:
@@ -710,7 +716,8 @@ class BrickerBrickify(bpy.types.Operator):
             sourceDup.animation_data_clear()
             # send to new mesh
             sourceDup.data = self.source.to_mesh(scn, True, 'PREVIEW')
-            # apply transform data
+            # apply transform data (hashing the mesh first, so translated copies can share voxelizations)
+            store_unbaked_hash(sourceDup)
             apply_transform(sourceDup)
             duplicates[curFrame] = sourceDup
             # update progress bar
@@ -75,9 +75,14 @@ class Caches(bpy.types.Operator):
         # clear light brick mesh cache
         if brick_mesh:
             bricker_bm_cache[cm.id] = None
-        # clear light matrix cache
+        # clear light matrix cache and source data used to create it
         if light_matrix:
             bricker_bfm_cache[cm.id] = None
+            bricker_bfm_dirty.add(cm.id)
+            for name in (cm.source_name, cm.source_name + "_duplicate"):
+                bricker_bvh_cache.pop(name, None)
+                bricker_source_mesh_cache.pop(name, None)
+            bricker_voxel_cache.clear()
         # clear deep matrix cache
         if deep_matrix:
             cm.BFMCache = ""
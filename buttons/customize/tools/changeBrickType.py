@@ -90,7 +90,7 @@ class changeBrickType(Operator):
                 # get cmlist item referred to by object
                 cm = getItemByID(scn.cmlist, obj.cmlist_id)
                 # get bricksDict from cache
-                bricksDict, _ = getBricksDict(cm=cm)
+                bricksDict, _ = getBricksDict(cm=cm, readOnly=True)
                 dictKey = getDictKey(obj.name)
                 # initialize properties
                 curBrickType = bricksDict[dictKey]["type"]
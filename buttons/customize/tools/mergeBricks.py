@@ -134,13 +134,14 @@ class mergeBricks(Operator):
 
         # sort keys
         keys.sort(key=lambda k: (strToList(k)[0] * strToList(k)[1] * strToList(k)[2]))
+        availableKeys = set(keys)
 
         for key in keys:
             # skip keys already merged to another brick
             if bricksDict[key]["parent"] not in [None, "self"]:
                 continue
             # attempt to merge current brick with other bricks in keys, according to available brick types
-            brickSize = attemptMerge(cm, bricksDict, key, keys, bricksDict[key]["size"], zStep, randState, preferLargest=True, mergeVertical=mergeVertical, targetType=targetType, height3Only=height3Only)
+            brickSize = attemptMerge(cm, bricksDict, key, availableKeys, bricksDict[key]["size"], zStep, randState, preferLargest=True, mergeVertical=mergeVertical, targetType=targetType, height3Only=height3Only)
             updatedKeys.append(key)
         return updatedKeys
 
@@ -36,11 +36,34 @@ from bpy.app.handlers import persistent, load_post
 
 # Addon imports
 from ...functions import *
-from ...lib.caches import bricker_bfm_cache
+from ...lib.caches import bricker_bfm_cache, bricker_bfm_dirty
+from ...lib.bricksDict.container import *
+from ...lib.bricksDict.serialize import LazyBricksDict
 
 python_undo_state = {}
 
 
+class PreEditCache(dict):
+    """ json strings of light caches before the undo push, keyed by cm_id (serialized on first access)
+
+    Caches recorded with a write log are rebuilt from their current entries and the
+    log, so they must be read before the caches are edited under a later undo state.
+    """
+
+    def __init__(self, snapshots):
+        super().__init__()
+        self.snapshots = snapshots
+
+    def __missing__(self, cm_id):
+        snapshot = self.snapshots[cm_id]
+        if type(snapshot) == tuple:
+            snapshot = UndoStack._preEditValues(*snapshot)
+        if type(snapshot) != str:
+            snapshot = json.dumps({k: dict(zip(entryFields, v)) for k, v in snapshot.items()})
+        self[cm_id] = snapshot
+        return snapshot
+
+
 class UndoStack():
     bl_category = "Bricker"
     bl_idname = "bricker.undo_stack"
@@ -77,6 +100,7 @@ class UndoStack():
 
     instance = None
     undo_depth = 500    # set in User Preferences?
+    undo_memory = 256 * 1024 * 1024  # approximate bytes of undo/redo states to keep
 
     ###################################################
     # undo / redo stack operations
@@ -102,32 +126,120 @@ class UndoStack():
 
     def isUpdating(self): return bpy.props.bricker_undoUpdating
 
-    def _create_state(self, action, bfm_cache):
+    def _create_state(self, action, bfm_cache, snapshots=None):
         return {
             'action':       action,
-            'bfm_cache':    bfm_cache
+            'bfm_cache':    bfm_cache,  # cm_id -> ("DELTA", json of changed entries) or ("FULL", json of whole cache)
+            'snapshots':    snapshots or {},  # cm_id -> pre-edit snapshot or (bricksDict, write log), diffed into 'bfm_cache' once the edit is done
+            'size':         sum(len(data) for _, data in bfm_cache.values()),
             }
 
+    @staticmethod
+    def _entryValues(entry):
+        return tuple(entry.get(f) for f in entryFields)
+
+    @staticmethod
+    def _entryDict(values):
+        return dict(zip(entryFields, values))
+
+    @staticmethod
+    def _getCachedDict(cm_id):
+        """ get light cache for cm_id, or None if it isn't a single model bricksDict """
+        cachedDict = bricker_bfm_cache.get(cm_id)
+        if type(cachedDict) is LazyBricksDict:
+            cachedDict = bricker_bfm_cache[cm_id] = cachedDict.load()
+        return cachedDict if cachedDict is not None and isBricksDict(cachedDict) else None
+
+    @staticmethod
+    def _preEditValues(bricksDict, writeLog):
+        """ entry values of whole bricksDict before the writes recorded in writeLog """
+        values = {k: UndoStack._entryValues(entry) for k, entry in bricksDict.items()}
+        for k, v in writeLog.items():
+            if v is None:
+                values.pop(k, None)
+            else:
+                values[k] = v
+        return values
+
+    def _snapshot(self, cm_id):
+        """ start recording writes to light cache (other caches are copied, animated caches are stored whole) """
+        cachedDict = self._getCachedDict(cm_id)
+        if cachedDict is None:
+            return json.dumps(bricker_bfm_cache.get(cm_id), default=jsonDefault)
+        if type(cachedDict) is BricksDict:
+            return (cachedDict, cachedDict.startWriteLog())
+        return {k: self._entryValues(entry) for k, entry in cachedDict.items()}
+
+    @staticmethod
+    def _stopRecording(state):
+        """ stop recording writes for light caches of state """
+        for snapshot in state['snapshots'].values():
+            if type(snapshot) == tuple and snapshot[0].writeLog is snapshot[1]:
+                snapshot[0].stopWriteLog()
+
+    def _finalize_state(self, state):
+        """ replace pre-edit snapshots of state with diffs against the current light cache """
+        self._stopRecording(state)
+        for cm_id, snapshot in state['snapshots'].items():
+            cachedDict = self._getCachedDict(cm_id)
+            if type(snapshot) == tuple:
+                recordedDict, writeLog = snapshot
+                if cachedDict is recordedDict:
+                    # only entries written since the push can have changed
+                    changed = {k: None if v is None else self._entryDict(v) for k, v in writeLog.items() if v != (self._entryValues(cachedDict[k]) if k in cachedDict else None)}
+                    state['bfm_cache'][cm_id] = ("DELTA", json.dumps(changed))
+                    state['size'] += len(state['bfm_cache'][cm_id][1])
+                    continue
+                # light cache was replaced rather than edited, so diff the whole model
+                snapshot = self._preEditValues(recordedDict, writeLog)
+            if type(snapshot) == str:
+                state['bfm_cache'][cm_id] = ("FULL", snapshot)
+            elif cachedDict is None:
+                state['bfm_cache'][cm_id] = ("FULL", json.dumps({k: self._entryDict(v) for k, v in snapshot.items()}))
+            else:
+                changed = {k: self._entryDict(v) for k, v in snapshot.items() if k not in cachedDict or self._entryValues(cachedDict[k]) != v}
+                changed.update({k: None for k in cachedDict.keys() if k not in snapshot})
+                state['bfm_cache'][cm_id] = ("DELTA", json.dumps(changed))
+            state['size'] += len(state['bfm_cache'][cm_id][1])
+        state['snapshots'] = {}
+
     def _restore_state(self, state):
+        """ restore light caches to state, returning the state that reverts the restore """
         global bricker_bfm_cache
-        for key in state['bfm_cache'].keys():
-            bricker_bfm_cache[key] = json.loads(state['bfm_cache'][key])
-
-    def appendState(self, action, stack, stackType, affected_ids="ALL"):
-        if action == "undo" and stackType == "redo":
-            new_bfm_cache = self.undo[-1]['bfm_cache']
-        elif action == "undo" and stackType == "redo":
-            new_bfm_cache = self.redo[-1]['bfm_cache']
-        else:
-            new_bfm_cache = {}
-            bfm_cached = stack[-1]["bfm_cache"] if len(stack) > 0 else {}
-            for cm_id in bricker_bfm_cache:
-                if affected_ids != "ALL" and cm_id not in affected_ids and cm_id in bfm_cached:
-                    new_bfm_cache[cm_id] = bfm_cached[cm_id]
-                else:
-                    new_bfm_cache[cm_id] = json.dumps(bricker_bfm_cache[cm_id])
-        stack.append(self._create_state(action, new_bfm_cache))
-        return new_bfm_cache
+        self._finalize_state(state)
+        inverse = {}
+        for cm_id, (kind, data) in state['bfm_cache'].items():
+            cachedDict = self._getCachedDict(cm_id)
+            if kind == "FULL":
+                inverse[cm_id] = ("FULL", json.dumps(bricker_bfm_cache.get(cm_id), default=jsonDefault))
+                cachedDict = json.loads(data)
+                bricker_bfm_cache[cm_id] = None if cachedDict is None else wrapBricksDicts(cachedDict)
+            elif cachedDict is not None:
+                entries = json.loads(data)
+                inverse[cm_id] = ("DELTA", json.dumps({k: self._entryDict(self._entryValues(cachedDict[k])) if k in cachedDict else None for k in entries}))
+                for k, entry in entries.items():
+                    if entry is None:
+                        cachedDict.pop(k, None)
+                    else:
+                        cachedDict[k] = BrickEntry(entry)
+            bricker_bfm_dirty.add(cm_id)
+        return self._create_state(state['action'], inverse)
+
+    def _limit_stack_size(self):
+        """ drop oldest undo states past undo_depth or undo_memory """
+        while len(self.undo) > self.undo_depth or (len(self.undo) > 1 and sum(state['size'] for state in self.undo + self.redo) > self.undo_memory):
+            self.undo.pop(0)
+
+    def appendState(self, action, stack, affected_ids="ALL"):
+        """ record light caches about to be edited by action (diffed once the next state is pushed) """
+        if stack:
+            self._finalize_state(stack[-1])
+        snapshots = {}
+        for cm_id in bricker_bfm_cache:
+            if affected_ids == "ALL" or cm_id in affected_ids:
+                snapshots[cm_id] = self._snapshot(cm_id)
+        stack.append(self._create_state(action, {}, snapshots))
+        return PreEditCache(snapshots)
 
     def undo_push(self, action, affected_ids="ALL", repeatable=False):
         # skip pushing to undo if action is repeatable and we are repeating actions
@@ -136,18 +248,16 @@ class UndoStack():
         # skip pushing to undo if bricker not initialized
         if not bpy.props.bricker_initialized:
             return
-        new_bfm_cache = self.appendState(action, self.undo, 'undo', affected_ids=affected_ids)
-        while len(self.undo) > self.undo_depth:
-            self.undo.pop(0)  # limit stack size
+        new_bfm_cache = self.appendState(action, self.undo, affected_ids=affected_ids)
         self.redo.clear()
+        self._limit_stack_size()
         self.instrument_write(action)
         return new_bfm_cache
 
     def undo_pop(self):
         if not self.undo:
             return
-        self.appendState('undo', self.redo, 'redo')
-        self._restore_state(self.undo.pop())
+        self.redo.append(self._restore_state(self.undo.pop()))
         self.instrument_write('undo')
         # iterate undo states
         global python_undo_state
@@ -157,7 +267,7 @@ class UndoStack():
     def undo_pop_clean(self):
         if not self.undo:
             return
-        self.undo.pop()
+        self._stopRecording(self.undo.pop())
 
     def undo_cancel(self):
         self._restore_state(self.undo.pop())
@@ -166,8 +276,8 @@ class UndoStack():
     def redo_pop(self):
         if not self.redo:
             return
-        self.appendState('redo', self.undo, 'undo')
-        self._restore_state(self.redo.pop())
+        self.undo.append(self._restore_state(self.redo.pop()))
+        self._limit_stack_size()
         self.instrument_write('redo')
         # iterate undo states
         global python_undo_state
@@ -372,6 +372,7 @@ class BrickerDelete(bpy.types.Operator):
         cm.transformScale = 1
         cm.modelCreatedOnFrame = -1
         cm.lastSourceMid = "-1,-1,-1"
+        cm.lastSourceHash = ""
         cm.lastLogoDetail = "NONE"
         cm.lastSplitModel = False
         cm.lastBrickType = "NONE"
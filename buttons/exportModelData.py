@@ -54,7 +54,7 @@ class exportModelData(Operator):
                 self.report({"WARNING"}, errorMsg)
                 return {"CANCELLED"}
             bType = "Frames" if cm.animated else "Bricks"
-            bricksDict, _ = getBricksDict(cm=cm)
+            bricksDict, _ = getBricksDict(cm=cm, readOnly=True)
             numBs = len([b for b in bricksDict.values() if b["draw"] and b["parent"] == "self"])
             # get model info
             modelInfoStrings = ["# Model Name:  " + cm.name,
@@ -64,7 +64,7 @@ class exportModelData(Operator):
                                 "# Number of %(bType)s:  %(numBs)s" % locals(),
                                 ""]
             # get bricksDict and separate into strings
-            bricksDictStrings = json.dumps(bricksDict).split("}, ")
+            bricksDictStrings = json.dumps(bricksDict, default=jsonDefault).split("}, ")
             for i,string in enumerate(bricksDictStrings):
                 whitespace = " " if string.startswith("\"") else ""
                 bricksDictStrings[i] = "%(whitespace)s%(string)s}," % locals()
@@ -0,0 +1,89 @@
+"""
+    Copyright (C) 2017 Bricks Brought to Life
+    http://bblanimation.com/
+    chris@bblanimation.com
+
+    Created by Christopher Gearhart
+
+        This program is free software: you can redistribute it and/or modify
+        it under the terms of the GNU General Public License as published by
+        the Free Software Foundation, either version 3 of the License, or
+        (at your option) any later version.
+
+        This program is distributed in the hope that it will be useful,
+        but WITHOUT ANY WARRANTY; without even the implied warranty of
+        MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+        GNU General Public License for more details.
+
+        You should have received a copy of the GNU General Public License
+        along with this program.  If not, see <http://www.gnu.org/licenses/>.
+    """
+
+# System imports
+import time
+
+# Blender imports
+import bpy
+
+# Addon imports
+from ..functions import *
+from ..lib.Brick.legal_brick_sizes import getLegalBrickSizes
+from .brickify import *
+
+
+class BrickerPrewarmMeshLibrary(bpy.types.Operator):
+    """Generate meshes for common brick and plate sizes with the active model's settings and store them to the on-disk brick mesh library"""
+    bl_idname = "bricker.prewarm_mesh_library"
+    bl_label = "Pre-warm Mesh Library"
+    bl_options = {"REGISTER"}
+
+    ################################################
+    # Blender Operator methods
+
+    @classmethod
+    def poll(self, context):
+        """ ensures operator can execute (if not, returns false) """
+        try:
+            scn, cm, n = getActiveContextInfo()
+        except IndexError:
+            return False
+        return cm.brickType != "CUSTOM" and bpy.data.objects.get(cm.source_name) is not None
+
+    def execute(self, context):
+        try:
+            startTime = time.time()
+            numMeshes = self.prewarmMeshLibrary()
+            self.report({"INFO"}, "Stored %(numMeshes)s brick meshes to library in %(secs).2f seconds" % {"numMeshes": numMeshes, "secs": time.time() - startTime})
+        except:
+            handle_exception()
+        return{"FINISHED"}
+
+    #############################################
+    # class methods
+
+    def prewarmMeshLibrary(self):
+        scn, cm, n = getActiveContextInfo()
+        if not getAddonPrefs().use_mesh_library:
+            self.report({"WARNING"}, "Brick mesh library is disabled in the addon preferences")
+            return 0
+        source = bpy.data.objects.get(cm.source_name)
+        source_details, dimensions = getDetailsAndBounds(source, cm)
+        logo_details, refLogo = BrickerBrickify.getLogo(scn, cm, dimensions)
+        legalBrickSizes = getLegalBrickSizes()
+        # get stud options for the current stud detail setting
+        studOptions = [True] if cm.studDetail == "ALL" else ([False] if cm.studDetail == "NONE" else [True, False])
+        undersideOptions = set((cm.exposedUndersideDetail, cm.hiddenUndersideDetail))
+        bmKeys = BrickMeshKeys(cm, dimensions, refLogo, cm.logoDetail, cm.logoScale, cm.logoInset)
+        numMeshes = 0
+        for height, bType in ((3, "BRICK"), (1, "PLATE")):
+            brickD = {"type": bType, "flipped": False, "rotated": False}
+            for size in legalBrickSizes[height][bType]:
+                brickSize = [size[0], size[1], height]
+                for useStud in studOptions:
+                    logoToUse = refLogo if useStud else None
+                    for undersideDetail in undersideOptions:
+                        getBrickMeshes(cm, brickD, dimensions, brickSize, undersideDetail, logoToUse, cm.logoDetail, logo_details, cm.logoScale, cm.logoInset, useStud, cm.circleVerts, bmKeys=bmKeys)
+                        numMeshes += 1
+        return numMeshes
+
+    #############################################
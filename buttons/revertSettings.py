@@ -72,4 +72,13 @@ class BrickerRevertSettings(Operator):
         cm.castDoubleCheckRays = str_to_bool(settings[11])
         cm.brickShell = settings[12]
         cm.calculationAxes = settings[13]
+        if len(settings) > 14:
+            cm.brickMatrixEngine = settings[14]
+        if len(settings) > 15:
+            cm.useNarrowBand = str_to_bool(settings[15])
+        if len(settings) > 16 and settings[16] != "None":
+            cm.useOctree = str_to_bool(settings[16])
+        if len(settings) > 18:
+            cm.shellThickness = int(settings[17])
+            cm.internalSupports = settings[18]
         cm.matrixIsDirty = False
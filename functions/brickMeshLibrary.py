@@ -0,0 +1,127 @@
+"""
+Copyright (C) 2017 Bricks Brought to Life
+http://bblanimation.com/
+chris@bblanimation.com
+
+Created by Christopher Gearhart
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# System imports
+import os
+import hashlib
+import numpy as np
+
+# Blender imports
+import bpy
+import bmesh
+
+# Addon imports
+# NONE!
+
+
+def getMeshLibraryDir():
+    """ get directory of on-disk brick mesh library (in the user config directory) """
+    return bpy.utils.user_resource("CONFIG", path=os.path.join("bricker", "brick_meshes"), autocreate=True)
+
+
+def getMeshLibraryPath(key):
+    """ get content-addressed library path for brick meshes with cache key 'key' """
+    keyHash = hashlib.sha1((bpy.props.bricker_version + key).encode()).hexdigest()
+    return os.path.join(getMeshLibraryDir(), keyHash + ".npz")
+
+
+def saveToMeshLibrary(key, bms):
+    """ write vertex/face arrays of brick bmeshes to on-disk library (failures are reported, never raised) """
+    try:
+        writeMeshLibraryFile(key, bms)
+    except Exception as e:
+        print("[Bricker] could not write brick mesh library file: " + str(e))
+
+
+def writeMeshLibraryFile(key, bms):
+    """ write brick bmeshes to on-disk library file for cache key 'key' """
+    counts, coords, faceVerts, faceLens, smooth, edgeVerts = [], [], [], [], [], []
+    for bm in bms:
+        bm.verts.index_update()
+        looseEdges = [e for e in bm.edges if not e.link_faces]
+        counts.append((len(bm.verts), len(bm.faces), len(looseEdges)))
+        coords += [v.co.to_tuple() for v in bm.verts]
+        for f in bm.faces:
+            faceVerts += [v.index for v in f.verts]
+            faceLens.append(len(f.verts))
+            smooth.append(f.smooth)
+        edgeVerts += [v.index for e in looseEdges for v in e.verts]
+    path = getMeshLibraryPath(key)
+    # write to temporary file first so concurrent sessions never read partial files
+    tmpPath = "%(path)s.%(pid)s.tmp" % {"path": path, "pid": os.getpid()}
+    try:
+        with open(tmpPath, "wb") as f:
+            np.savez_compressed(f, counts=np.array(counts, dtype=np.int32).reshape(-1, 3), coords=np.array(coords, dtype=np.float64).reshape(-1, 3),
+                                faceVerts=np.array(faceVerts, dtype=np.int32), faceLens=np.array(faceLens, dtype=np.int32),
+                                smooth=np.array(smooth, dtype=bool), edgeVerts=np.array(edgeVerts, dtype=np.int32))
+        os.replace(tmpPath, path)
+    finally:
+        if os.path.exists(tmpPath):
+            os.remove(tmpPath)
+
+
+def loadFromMeshLibrary(key):
+    """ read brick bmeshes from on-disk library (returns None if not in library or on failure) """
+    try:
+        return readMeshLibraryFile(key)
+    except Exception as e:
+        print("[Bricker] could not read brick mesh library file: " + str(e))
+        return None
+
+
+def readMeshLibraryFile(key):
+    """ read brick bmeshes from on-disk library file for cache key 'key' """
+    path = getMeshLibraryPath(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            counts = data["counts"].tolist()
+            coords = data["coords"].tolist()
+            faceVerts = data["faceVerts"].tolist()
+            faceLens = data["faceLens"].tolist()
+            smooth = data["smooth"].tolist()
+            edgeVerts = data["edgeVerts"].tolist()
+    except (OSError, ValueError, KeyError) as e:
+        print("[Bricker] could not read brick mesh library file: " + str(e))
+        return None
+    bms = []
+    v0 = f0 = l0 = e0 = 0
+    try:
+        for numVerts, numFaces, numEdges in counts:
+            bm = bmesh.new()
+            bms.append(bm)
+            verts = [bm.verts.new(co) for co in coords[v0:v0 + numVerts]]
+            for faceLen, faceSmooth in zip(faceLens[f0:f0 + numFaces], smooth[f0:f0 + numFaces]):
+                f = bm.faces.new([verts[i] for i in faceVerts[l0:l0 + faceLen]])
+                f.smooth = faceSmooth
+                l0 += faceLen
+            for i in range(e0, e0 + numEdges * 2, 2):
+                bm.edges.new((verts[edgeVerts[i]], verts[edgeVerts[i + 1]]))
+            v0 += numVerts
+            f0 += numFaces
+            e0 += numEdges * 2
+    except Exception as e:
+        print("[Bricker] invalid brick mesh library file: " + str(e))
+        for bm in bms:
+            bm.free()
+        return None
+    return bms
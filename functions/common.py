@@ -469,8 +469,15 @@ def checkEqual3(lst):
 # checkEqual2 and checkEqual3 can't be easily changed to adopt to compare a is b instead of a == b.
 
 
+def jsonDefault(obj):
+    """ serialize objects json can't handle natively (e.g. BricksDict entries) """
+    if hasattr(obj, "toDict"):
+        return obj.toDict()
+    raise TypeError("%(obj)r is not JSON serializable" % locals())
+
+
 def deepcopy(object):
-    jsonObj = json.dumps(object)
+    jsonObj = json.dumps(object, default=jsonDefault)
     newObj = json.loads(jsonObj)
     return newObj
 
@@ -52,6 +52,10 @@ def getActiveContextInfo(cm=None, cm_idx=None, cm_id=None):
     return scn, cm, n
 
 
+def getAddonPrefs():
+    return bpy.context.user_preferences.addons[bpy.props.bricker_module_name].preferences
+
+
 def centerMeshOrigin(m, dimensions, size):
     # get half width
     d0 = Vector((dimensions["width"] / 2, dimensions["width"] / 2, 0))
@@ -276,7 +280,7 @@ def brick_materials_loaded():
 def getMatrixSettings(cm=None):
     cm = cm or getActiveContextInfo()[1]
     # TODO: Maybe remove custom object names from this?
-    return listToStr([cm.brickHeight, cm.gap, cm.brickType, cm.distOffset, cm.customObjectName1, cm.customObjectName2, cm.customObjectName3, cm.useNormals, cm.insidenessRayCastDir, cm.castDoubleCheckRays, cm.brickShell, cm.calculationAxes])
+    return listToStr([cm.brickHeight, cm.gap, cm.brickType, cm.distOffset, cm.customObjectName1, cm.customObjectName2, cm.customObjectName3, cm.useNormals, cm.insidenessRayCastDir, cm.castDoubleCheckRays, cm.brickShell, cm.calculationAxes, cm.brickMatrixEngine, cm.useNarrowBand, cm.useOctree if cm.brickMatrixEngine != "SCANLINE" else None] + ([cm.shellThickness, cm.internalSupports] if cm.useNarrowBand else []))
 
 
 def matrixReallyIsDirty(cm):
@@ -324,10 +328,10 @@ def gammaCorrect(rgba, val):
 def getKeysDict(bricksDict, keys=None):
     """ get dictionary of bricksDict keys based on z value """
     keys = keys or list(bricksDict.keys())
-    keys.sort(key=lambda x: (strToList(x)[0], strToList(x)[1]))
+    keys.sort(key=lambda x: getDictLoc(x, bricksDict)[:2])
     keysDict = {}
     for k0 in keys:
-        z = strToList(k0)[2]
+        z = getDictLoc(k0, bricksDict)[2]
         if bricksDict[k0]["draw"]:
             if z in keysDict:
                 keysDict[z].append(k0)
@@ -374,8 +378,10 @@ def getDictKey(name):
     dictKey = name.split("__")[-1]
     return dictKey
 
-def getDictLoc(dictKey):
-    return strToList(dictKey)
+def getDictLoc(dictKey, bricksDict=None):
+    """ get [x, y, z] location of dict key (read from the BricksDict entry when available) """
+    loc = getattr(bricksDict.get(dictKey), "loc", None) if bricksDict else None
+    return strToList(dictKey) if loc is None else list(loc)
 
 
 def getBrickCenter(cm, bricksDict, key, loc=None, zStep=None):
@@ -22,6 +22,7 @@ Created by Christopher Gearhart
 # System imports
 import bmesh
 import math
+import numpy as np
 
 # Blender imports
 import bpy
@@ -31,8 +32,32 @@ from mathutils import Vector
 from .common import *
 
 
+class Lattice:
+    """ regular lattice of coordinates (computed on demand rather than stored for every lattice vert) """
+
+    def __init__(self, vertDist:Vector, offset:Vector, h_res:Vector, shape:tuple):
+        self.step = Vector(vertDist)
+        self.offset = Vector(offset)
+        self.h_res = Vector(h_res)
+        self.shape = tuple(shape)
+        self.origin = self.coord(0, 0, 0)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def coord(self, x:int, y:int, z:int):
+        """ return coordinate of lattice vert at index (x, y, z) """
+        if not (0 <= x < self.shape[0] and 0 <= y < self.shape[1] and 0 <= z < self.shape[2]):
+            raise IndexError("lattice index (%(x)s, %(y)s, %(z)s) out of range" % locals())
+        return vec_mult(Vector((x, y, z)) - self.h_res, self.step) + self.offset
+
+    def axisCoords(self, axis:int):
+        """ return numpy array of lattice coordinates along 'axis' """
+        return (np.arange(self.shape[axis]) - self.h_res[axis]) * self.step[axis] + self.offset[axis]
+
+
 def generateLattice(vertDist:Vector, scale:Vector, offset:Vector=Vector((0, 0, 0)), visualize:bool=False):
-    """ return lattice coordinate matrix surrounding object of size 'scale'
+    """ return lattice of coordinates surrounding object of size 'scale'
 
     Keyword arguments:
     vertDist  -- distance between lattice verts in 3D space
@@ -51,20 +76,19 @@ def generateLattice(vertDist:Vector, scale:Vector, offset:Vector=Vector((0, 0, 0
     # round up lattice res
     res = Vector(round_up(round(val), 2) for val in res)
     h_res = res / 2
-    # populate coord matrix
+    # create lattice (coordinates computed on demand)
     nx, ny, nz = int(res.x) + 2, int(res.y) + 2, int(res.z) + 2
-    create_coord = lambda v: vec_mult(v - h_res, vertDist) + offset
-    coordMatrix = [[[create_coord(Vector((x, y, z))) for z in range(nz)] for y in range(ny)] for x in range(nx)]
+    lattice = Lattice(vertDist, offset, h_res, (nx, ny, nz))
 
     if visualize:
         # create bmesh
         bme = bmesh.new()
-        vertMatrix = np.zeros((len(coordMatrix), len(coordMatrix[0]), len(coordMatrix[0][0]))).tolist()
+        vertMatrix = np.zeros((nx, ny, nz)).tolist()
         # add vertex for each coordinate
-        for x in range(len(coordMatrix)):
-            for y in range(len(coordMatrix[0])):
-                for z in range(len(coordMatrix[0][0])):
-                    vertMatrix[x][y][z] = bme.verts.new(coordMatrix[x][y][z])
+        for x in range(nx):
+            for y in range(ny):
+                for z in range(nz):
+                    vertMatrix[x][y][z] = bme.verts.new(lattice.coord(x, y, z))
                     # create new edges from vert
                     if x != 0: bme.edges.new((vertMatrix[x][y][z], vertMatrix[x-1][y][z]))
                     if y != 0: bme.edges.new((vertMatrix[x][y][z], vertMatrix[x][y-1][z]))
@@ -72,4 +96,4 @@ def generateLattice(vertDist:Vector, scale:Vector, offset:Vector=Vector((0, 0, 0
         # draw bmesh verts in 3D space
         drawBMesh(bme)
 
-    return coordMatrix
+    return lattice
@@ -21,38 +21,110 @@ Created by Christopher Gearhart
 
 # System imports
 import bmesh
+import hashlib
+import numpy as np
 
 # Blender imports
 import bpy
 from mathutils import Vector
 
 
-# from CG Cookie's retopoflow plugin
-def hash_object(obj:bpy.types.Object):
+def hash_object(obj:bpy.types.Object, transform:bool=True, sample:int=None, offset:Vector=None, precision:int=4):
+    """ returns digest of mesh data, modifiers and material assignments of 'obj'
+
+    Keyword Arguments:
+    obj       -- mesh object to fingerprint
+    transform -- include world matrix of 'obj' in digest
+    sample    -- hash at most this many vertex coordinates (evenly spaced) instead of all of them
+    offset    -- hash location of 'obj' relative to this location (rounded to 'precision') instead of its world location, so translated copies match
+    """
     if obj is None:
         return None
     assert type(obj) is bpy.types.Object, "Only call hash_object on mesh objects!"
     assert type(obj.data) is bpy.types.Mesh, "Only call hash_object on mesh objects!"
-    # get object data to act as a hash
     me = obj.data
-    counts = (len(me.vertices), len(me.edges), len(me.polygons), len(obj.modifiers))
-    if me.vertices:
-        bbox = (tuple(min(v.co for v in me.vertices)), tuple(max(v.co for v in me.vertices)))
-    else:
-        bbox = (None, None)
-    vsum   = tuple(sum((v.co for v in me.vertices), Vector((0, 0, 0))))
-    xform  = tuple(e for l in obj.matrix_world for e in l)
-    hashed = (counts, bbox, vsum, xform, hash(obj))  # ob.name???
-    return hashed
-
-
-# from CG Cookie's retopoflow plugin
-def hash_bmesh(bme:bmesh.types.BMesh):
+    digest = hashlib.md5()
+    digest.update(np.array((len(me.vertices), len(me.edges), len(me.polygons), len(me.loops)), dtype=np.int64).tobytes())
+    # vertex coordinates and face topology
+    digest.update(sample_array(get_foreach(me.vertices, "co", np.float32, 3).reshape(-1, 3), sample).tobytes())
+    digest.update(sample_array(get_foreach(me.loops, "vertex_index", np.int32), sample).tobytes())
+    # material assignments
+    digest.update(sample_array(get_foreach(me.polygons, "material_index", np.int32), sample).tobytes())
+    digest.update(repr([slot.material.name if slot.material else None for slot in obj.material_slots]).encode())
+    # modifier stack
+    digest.update(repr([hash_rna_props(mod) for mod in obj.modifiers]).encode())
+    if transform and offset is not None:
+        digest.update(np.array(obj.matrix_world.to_3x3(), dtype=np.float32).tobytes())
+        digest.update(round_offset(obj.matrix_world.to_translation(), offset, precision).tobytes())
+    elif transform:
+        digest.update(np.array(obj.matrix_world, dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+
+def store_unbaked_hash(obj:bpy.types.Object):
+    """ store digest and location of 'obj' before 'apply_transform' bakes its world matrix into its mesh (see 'hash_object_relative') """
+    loc = obj.matrix_world.to_translation()
+    obj["bricker_unbaked_hash"] = hash_object(obj, offset=loc)
+    obj["bricker_unbaked_location"] = loc.to_tuple()
+
+
+def hash_object_relative(obj:bpy.types.Object, offset:Vector, precision:int=4):
+    """ returns digest of 'obj' with its location relative to 'offset' (translated copies match, even once their transforms are applied) """
+    if "bricker_unbaked_hash" not in obj.keys():
+        return hash_object(obj, offset=offset, precision=precision)
+    digest = hashlib.md5(obj["bricker_unbaked_hash"].encode())
+    digest.update(round_offset(Vector(obj["bricker_unbaked_location"]), offset, precision).tobytes())
+    return digest.hexdigest()
+
+
+def round_offset(loc:Vector, offset:Vector, precision:int=4):
+    """ returns 'loc' relative to 'offset' as float32 array rounded to 'precision' (without negative zeros) """
+    return (np.round(np.subtract(loc, offset), precision) + 0.0).astype(np.float32)
+
+
+def hash_bmesh(bme:bmesh.types.BMesh, sample:int=None):
+    """ returns digest of vertex coordinates and face topology of 'bme' """
     if bme is None:
         return None
     assert type(bme) is bmesh.types.BMesh, 'Only call hash_bmesh on BMesh objects!'
-    counts = (len(bme.verts), len(bme.edges), len(bme.faces))
-    bbox   = BBox(from_bmverts=self.bme.verts)
-    vsum   = tuple(sum((v.co for v in bme.verts), Vector((0, 0, 0))))
-    hashed = (counts, tuple(bbox.min), tuple(bbox.max), vsum)
-    return hashed
+    bme.verts.index_update()
+    coords = np.array([v.co.to_tuple() for v in bme.verts], dtype=np.float32)
+    faceVerts = np.array([v.index for f in bme.faces for v in f.verts], dtype=np.int32)
+    digest = hashlib.md5()
+    digest.update(np.array((len(bme.verts), len(bme.edges), len(bme.faces)), dtype=np.int64).tobytes())
+    digest.update(sample_array(coords, sample).tobytes())
+    digest.update(sample_array(faceVerts, sample).tobytes())
+    return digest.hexdigest()
+
+
+def get_foreach(collection, attr:str, dtype, size:int=1):
+    """ read 'attr' of every item in bpy collection into NumPy array with 'foreach_get' """
+    arr = np.empty(len(collection) * size, dtype=dtype)
+    collection.foreach_get(attr, arr)
+    return arr
+
+
+def sample_array(arr, sample:int=None):
+    """ returns at most 'sample' evenly spaced items of 'arr' (all items if sample is None) """
+    if sample is None or len(arr) <= sample:
+        return arr
+    return np.ascontiguousarray(arr[::-(-len(arr) // sample)])
+
+
+def hash_rna_props(data):
+    """ returns tuple of the simple RNA property values of 'data' (e.g. a modifier) """
+    values = []
+    for prop in data.bl_rna.properties:
+        if prop.identifier == "rna_type":
+            continue
+        value = getattr(data, prop.identifier, None)
+        if prop.type == "POINTER":
+            value = getattr(value, "name", None)
+        elif prop.type == "COLLECTION":
+            continue
+        elif type(value) is set:
+            value = tuple(sorted(value))
+        elif getattr(prop, "array_length", 0) > 0:
+            value = tuple(value)
+        values.append((prop.identifier, value))
+    return tuple(values)
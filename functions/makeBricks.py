@@ -23,6 +23,7 @@ Created by Christopher Gearhart
 import bmesh
 import math
 import time
+import multiprocessing
 import sys
 import random
 import json
@@ -36,6 +37,7 @@ from mathutils import Vector, Matrix
 from .hashObject import hash_object
 from ..lib.Brick import Bricks
 from ..lib.bricksDict import *
+from ..lib.bricksDict.voxelize import getNumProcesses
 from .common import *
 from .wrappers import *
 from .general import bounds
@@ -66,7 +68,7 @@ def makeBricks(source, parent, logo, logo_details, dimensions, bricksDict, cm=No
     denom = sum([len(keysDict[z0]) for z0 in keysDict.keys()])
     # store first key to active keys
     if cm.activeKey[0] == -1 and len(keys) > 0:
-        loc = strToList(keys[0])
+        loc = getDictLoc(keys[0], bricksDict)
         cm.activeKey = loc
 
     # get brick group
@@ -95,7 +97,7 @@ def makeBricks(source, parent, logo, logo_details, dimensions, bricksDict, cm=No
     lowestZ = -1
     availableKeys = []
     maxBrickHeight = 1 if zStep == 3 else max(legalBricks.keys())
-    connectThresh = 1 if cm.brickType == "CUSTOM" else cm.connectThresh
+    connectThresh = 1 if cm.brickType == "CUSTOM" or cm.mergeType == "OPTIMAL" else cm.connectThresh
     # set up internal material for this object
     internalMat = None if len(source.data.materials) == 0 else bpy.data.materials.get(cm.internalMatName) or bpy.data.materials.get("Bricker_%(n)s_internal" % locals()) or bpy.data.materials.new("Bricker_%(n)s_internal" % locals())
     if internalMat is not None and cm.materialType == "SOURCE" and cm.matShellDepth < cm.shellThickness:
@@ -122,84 +124,92 @@ def makeBricks(source, parent, logo, logo_details, dimensions, bricksDict, cm=No
     else:
         # initialize progress bar around cursor
         old_percent = updateProgressBars(printStatus, cursorStatus, 0, -1, "Merging")
-        # run merge operations (twice if flat brick type)
-        for timeThrough in range(numIters):
-            # iterate through z locations in bricksDict (bottom to top)
-            for z in sorted(keysDict.keys()):
-                # skip second and third rows on first time through
-                if numIters == 2 and cm.alignBricks:
-                    # initialize lowestZ if not done already
-                    if lowestZ == -0.1:
-                        lowestZ = z
-                    if skipThisRow(cm, timeThrough, lowestZ, z):
-                        continue
-                # get availableKeys for attemptMerge
-                availableKeysBase = []
-                for ii in range(maxBrickHeight):
-                    if ii + z in keysDict:
-                        availableKeysBase += keysDict[z + ii]
-                # get small duplicate of bricksDict for variations
-                if connectThresh > 1:
-                    bricksDictsBase = {}
-                    for k4 in availableKeysBase:
-                        bricksDictsBase[k4] = deepcopy(bricksDict[k4])
-                    bricksDicts = [deepcopy(bricksDictsBase) for j in range(connectThresh)]
-                    numAlignedEdges = [0 for idx in range(connectThresh)]
-                else:
-                    bricksDicts = [bricksDict]
-                # calculate build variations for current z level
-                for j in range(connectThresh):
-                    availableKeys = availableKeysBase.copy()
-                    numBricks = 0
-                    if cm.mergeType == "RANDOM":
-                        random.seed(cm.mergeSeed + i)
-                        random.shuffle(keysDict[z])
-                    # iterate through keys on current z level
-                    for key in keysDict[z]:
-                        i += 1 / connectThresh
-                        brickD = bricksDicts[j][key]
-                        # skip keys that are already drawn or have attempted merge
-                        if brickD["attempted_merge"] or brickD["parent"] not in [None, "self"]:
-                            # remove ignored keys from availableKeys (for attemptMerge)
-                            if key in availableKeys:
-                                availableKeys.remove(key)
+        # merge independent z levels of BRICKS AND PLATES models together (only possible without connectivity scoring)
+        layerPipeline = numIters == 2 and connectThresh == 1 and cm.mergeType != "OPTIMAL"
+        # set up pool for evaluating connectivity variations / independent z levels in parallel
+        numProcesses = getNumProcesses(getAddonPrefs().merge_processes) if connectThresh > 1 or layerPipeline else 1
+        pool = multiprocessing.get_context("fork").Pool(min(numProcesses, connectThresh) if connectThresh > 1 else numProcesses) if numProcesses > 1 else None
+        mergeSettings = getMergeSettings(cm) if pool is not None else None
+        try:
+            # run merge operations (twice if flat brick type)
+            for timeThrough in range(numIters):
+                # get z locations in bricksDict to merge (bottom to top)
+                zLevels = []
+                for z in sorted(keysDict.keys()):
+                    # skip second and third rows on first time through
+                    if numIters == 2 and cm.alignBricks:
+                        # initialize lowestZ if not done already
+                        if lowestZ == -0.1:
+                            lowestZ = z
+                        if skipThisRow(cm, timeThrough, lowestZ, z):
                             continue
-
-                        # initialize loc
-                        loc = strToList(key)
-
-                        # merge current brick with available adjacent bricks
-                        brickSize = mergeWithAdjacentBricks(cm, brickD, bricksDicts[j], key, availableKeys, [1, 1, zStep], zStep, randS1, mergeVertical=mergeVertical)
-                        brickD["size"] = brickSize
-                        # iterate number aligned edges and bricks if generating multiple variations
-                        if connectThresh > 1:
-                            numAlignedEdges[j] += getNumAlignedEdges(cm, bricksDict, brickSize, key, loc, zStep)
-                            numBricks += 1
-                        # add brickSize to cm.brickSizesUsed if not already there
-                        brickSizeStr = listToStr(sorted(brickSize[:2]) + [brickSize[2]])
-                        updateBrickSizesAndTypesUsed(cm, brickSizeStr, brickD["type"])
-
+                    zLevels.append(z)
+                if layerPipeline:
+                    for group in getLayerGroups(bricksDict, keysDict, zLevels, maxBrickHeight, mergeVertical):
+                        # merge z levels in group (seeded per z level, so results don't depend on the pool)
+                        seeds = [getVariationSeed(cm.mergeSeed, timeThrough, z, 0) for z, _ in group]
+                        freeKeys = [k for z, _ in group for k in keysDict[z] if not bricksDict[k]["attempted_merge"]]
+                        if pool is None:
+                            results = [mergeLayerVariation(cm, bricksDict, None, keysDict[z], windowKeys, zStep, mergeVertical, seed) for (z, windowKeys), seed in zip(group, seeds)]
+                        else:
+                            results = pool.map(mergeLayerVariationWorker, [(mergeSettings, BricksDict({k: bricksDict[k] for k in windowKeys}), None, keysDict[z], windowKeys, zStep, mergeVertical, seed) for (z, windowKeys), seed in zip(group, seeds)])
+                        for (z, _), result in zip(group, results):
+                            if pool is not None:
+                                setMergeData(bricksDict, result[2])
+                            # add brick sizes to cm.brickSizesUsed if not already there
+                            for brickSizeStr, typ in result[1]:
+                                updateBrickSizesAndTypesUsed(cm, brickSizeStr, typ)
+                            i += len(keysDict[z])
+                        # workers only see their own z levels, so get exposure once the whole group is merged
+                        setBrickExposures(cm, bricksDict, freeKeys)
                         # print status to terminal and cursor
-                        cur_percent = (i / denom)
-                        old_percent = updateProgressBars(printStatus, cursorStatus, cur_percent, old_percent, "Merging")
-
-                        # remove keys in new brick from availableKeys (for attemptMerge)
-                        updateKeysLists(cm, brickSize, loc, availableKeys, key)
-
-                    if connectThresh > 1:
-                        # if no aligned edges / bricks found, skip to next z level
-                        if numAlignedEdges[j] == 0:
-                            i += (len(keysDict[z]) * connectThresh - 1) / connectThresh
-                            break
-                        # add double the number of bricks so connectivity threshold is weighted towards larger bricks
-                        numAlignedEdges[j] += numBricks * 2
-
-                # choose optimal variation from above for current z level
-                if connectThresh > 1:
-                    optimalTest = numAlignedEdges.index(min(numAlignedEdges))
-                    for k3 in bricksDicts[optimalTest]:
-                        bricksDict[k3] = bricksDicts[optimalTest][k3]
-
+                        old_percent = updateProgressBars(printStatus, cursorStatus, i / denom, old_percent, "Merging")
+                    continue
+                # iterate through z locations one at a time
+                for z in zLevels:
+                    # get availableKeys for attemptMerge
+                    availableKeysBase = []
+                    for ii in range(maxBrickHeight):
+                        if ii + z in keysDict:
+                            availableKeysBase += keysDict[z + ii]
+                    if cm.mergeType == "OPTIMAL" and cm.brickType != "CUSTOM":
+                        sizesUsed = optimizeLayerMerge(cm, bricksDict, keysDict[z], set(availableKeysBase), zStep, mergeVertical, timeLimit=cm.mergeTimeLimit)
+                    elif connectThresh == 1:
+                        if cm.mergeType == "RANDOM":
+                            random.seed(cm.mergeSeed + i)
+                            random.shuffle(keysDict[z])
+                        _, sizesUsed = mergeLayer(cm, bricksDict, keysDict[z], set(availableKeysBase), zStep, randS1, mergeVertical)
+                    else:
+                        # calculate build variations for current z level (seeded per variation, so results don't depend on the pool)
+                        seeds = [getVariationSeed(cm.mergeSeed, timeThrough, z, j) for j in range(connectThresh)]
+                        if pool is None:
+                            variations = iterLayerVariations(cm, bricksDict, keysDict[z], availableKeysBase, zStep, mergeVertical, seeds)
+                        else:
+                            window = BricksDict({k: bricksDict[k] for k in availableKeysBase})
+                            alignDict = getAlignDict(bricksDict, keysDict[z])
+                            variations = pool.imap(mergeLayerVariationWorker, [(mergeSettings, window, alignDict, keysDict[z], availableKeysBase, zStep, mergeVertical, seed) for seed in seeds])
+                        # choose optimal variation (fewest aligned edges) for current z level
+                        optimal = None
+                        for j, variation in enumerate(variations):
+                            if optimal is None or variation[0] < optimal[0]:
+                                optimal = variation
+                            # print status to terminal and cursor
+                            old_percent = updateProgressBars(printStatus, cursorStatus, (i + len(keysDict[z]) * (j + 1) / connectThresh) / denom, old_percent, "Merging")
+                            # if no aligned edges / bricks found, skip remaining variations
+                            if variation[0] == 0:
+                                break
+                        _, sizesUsed, variation = optimal
+                        applyMergeVariation(bricksDict, variation)
+                    # add brick sizes to cm.brickSizesUsed if not already there
+                    for brickSizeStr, typ in sizesUsed:
+                        updateBrickSizesAndTypesUsed(cm, brickSizeStr, typ)
+                    # print status to terminal and cursor
+                    i += len(keysDict[z])
+                    old_percent = updateProgressBars(printStatus, cursorStatus, i / denom, old_percent, "Merging")
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
         # end 'Merging' progress bar
         updateProgressBars(printStatus, cursorStatus, 1, 0, "Merging", end=True)
 
@@ -207,12 +217,13 @@ def makeBricks(source, parent, logo, logo_details, dimensions, bricksDict, cm=No
     old_percent = updateProgressBars(printStatus, cursorStatus, 0, -1, "Building")
 
     # draw merged bricks
+    bmKeys = BrickMeshKeys(cm, dimensions, logo, cm.logoDetail, cm.logoScale, cm.logoInset)
     for i, k2 in enumerate(keys):
         if bricksDict[k2]["parent"] != "self" or not bricksDict[k2]["draw"]:
             continue
-        loc = strToList(k2)
+        loc = getDictLoc(k2, bricksDict)
         # create brick based on the current brick info
-        drawBrick(cm, bricksDict, k2, loc, i, dimensions, zStep, bricksDict[k2]["size"], split, customData, brickScale, bricksCreated, allMeshes, logo, logo_details, mats, brick_mats, internalMat, randS1, randS2, randS3)
+        drawBrick(cm, bricksDict, k2, loc, i, dimensions, zStep, bricksDict[k2]["size"], split, customData, brickScale, bricksCreated, allMeshes, logo, logo_details, mats, brick_mats, internalMat, randS1, randS2, randS3, bmKeys=bmKeys)
         # print status to terminal and cursor
         old_percent = updateProgressBars(printStatus, cursorStatus, i/len(bricksDict.keys()), old_percent, "Building")
 
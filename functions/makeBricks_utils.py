@@ -26,8 +26,10 @@ import time
 import sys
 import random
 import json
+import zlib
 import copy
 import numpy as np
+from types import SimpleNamespace
 
 # Blender imports
 import bpy
@@ -35,6 +37,7 @@ from mathutils import Vector, Matrix
 
 # Addon imports
 from .hashObject import hash_object
+from .brickMeshLibrary import *
 from ..lib.Brick import Bricks
 from ..lib.bricksDict import *
 from .common import *
@@ -43,7 +46,7 @@ from .general import *
 from ..lib.caches import bricker_bm_cache
 
 
-def drawBrick(cm, bricksDict, key, loc, i, dimensions, zStep, brickSize, split, customData, brickScale, bricksCreated, allMeshes, logo, logo_details, mats, brick_mats, internalMat, randS1, randS2, randS3):
+def drawBrick(cm, bricksDict, key, loc, i, dimensions, zStep, brickSize, split, customData, brickScale, bricksCreated, allMeshes, logo, logo_details, mats, brick_mats, internalMat, randS1, randS2, randS3, bmKeys=None):
     brickD = bricksDict[key]
     # check exposure of current [merged] brick
     if brickD["top_exposed"] is None or brickD["bot_exposed"] is None or cm.buildIsDirty:
@@ -69,7 +72,7 @@ def drawBrick(cm, bricksDict, key, loc, i, dimensions, zStep, brickSize, split,
         m = customData[int(brickD["type"][-1]) - 1]
     else:
         # get brick mesh
-        m = getBrickData(cm, brickD, randS3, dimensions, brickSize, undersideDetail, logoToUse, cm.logoDetail, logo_details, cm.logoScale, cm.logoInset, useStud, cm.circleVerts)
+        m = getBrickData(cm, brickD, randS3, dimensions, brickSize, undersideDetail, logoToUse, cm.logoDetail, logo_details, cm.logoScale, cm.logoInset, useStud, cm.circleVerts, bmKeys=bmKeys)
     if not split:
         m = m.copy()
     # apply random rotation to edit mesh according to parameters
@@ -163,11 +166,140 @@ def mergeWithAdjacentBricks(cm, brickD, bricksDict, key, keysNotChecked, default
     return brickSize
 
 
+# cm settings read by mergeLayer (copied for merge worker processes, which can't access Blender data)
+mergeSettingAttrs = ("brickType", "maxWidth", "maxDepth", "legalBricksOnly", "mergeInconsistentMats", "materialType", "mergeType", "buildIsDirty")
+
+
+def mergeLayer(cm, bricksDict, keys, availableKeys, zStep, randState, mergeVertical=True, alignDict=None):
+    """ merge bricks starting at 'keys' (one z level) with adjacent bricks in 'availableKeys' (set, updated in place)
+
+    Keyword Arguments:
+    alignDict -- bricksDict to count aligned edges with bricks below in (skipped if None)
+
+    returns connectivity score (0 if no aligned edges found) and list of (brick size string, brick type) for merged bricks
+    """
+    numAlignedEdges = 0
+    numBricks = 0
+    sizesUsed = []
+    for key in keys:
+        brickD = bricksDict[key]
+        # skip keys that are already drawn or have attempted merge
+        if brickD["attempted_merge"] or brickD["parent"] not in [None, "self"]:
+            # remove ignored keys from availableKeys (for attemptMerge)
+            availableKeys.discard(key)
+            continue
+
+        # initialize loc
+        loc = getDictLoc(key, bricksDict)
+
+        # merge current brick with available adjacent bricks
+        brickSize = mergeWithAdjacentBricks(cm, brickD, bricksDict, key, availableKeys, [1, 1, zStep], zStep, randState, mergeVertical=mergeVertical)
+        brickD["size"] = brickSize
+        # iterate number aligned edges and bricks if generating multiple variations
+        if alignDict is not None:
+            numAlignedEdges += getNumAlignedEdges(cm, alignDict, brickSize, key, loc, zStep)
+            numBricks += 1
+        # store brickSize for cm.brickSizesUsed
+        sizesUsed.append((listToStr(sorted(brickSize[:2]) + [brickSize[2]]), brickD["type"]))
+
+        # remove keys in new brick from availableKeys (for attemptMerge)
+        updateKeysLists(cm, brickSize, loc, availableKeys, key)
+
+    # add double the number of bricks so connectivity threshold is weighted towards larger bricks
+    if numAlignedEdges > 0:
+        numAlignedEdges += numBricks * 2
+    return numAlignedEdges, sizesUsed
+
+
+def getMergeSettings(cm):
+    """ picklable copy of the cm settings read by mergeLayer """
+    return SimpleNamespace(**{attr: getattr(cm, attr) for attr in mergeSettingAttrs})
+
+
+def getVariationSeed(mergeSeed, timeThrough, z, j):
+    """ seed for connectivity variation 'j' of z level 'z' (independent of the order variations are evaluated in) """
+    return zlib.crc32("{},{},{},{}".format(mergeSeed, timeThrough, z, j).encode())
+
+
+def mergeLayerVariation(cm, bricksDict, alignDict, keys, availableKeys, zStep, mergeVertical, seed):
+    """ merge z level 'keys' in variation 'bricksDict' with random states seeded by 'seed' """
+    if cm.mergeType == "RANDOM":
+        keys = keys.copy()
+        random.Random(seed).shuffle(keys)
+    return mergeLayer(cm, bricksDict, keys, set(availableKeys), zStep, np.random.RandomState(seed), mergeVertical, alignDict)
+
+
+def iterLayerVariations(cm, bricksDict, keys, availableKeys, zStep, mergeVertical, seeds):
+    """ evaluate connectivity variations one at a time on BricksDictLayers over bricksDict """
+    for seed in seeds:
+        layer = BricksDictLayer(bricksDict, availableKeys)
+        score, sizesUsed = mergeLayerVariation(cm, layer, bricksDict, keys, availableKeys, zStep, mergeVertical, seed)
+        yield score, sizesUsed, layer
+
+
+def mergeLayerVariationWorker(args):
+    """ merge connectivity variation in merge worker process (returns compact merge data instead of the variation) """
+    settings, window, alignDict, keys, availableKeys, zStep, mergeVertical, seed = args
+    score, sizesUsed = mergeLayerVariation(settings, window, alignDict, keys, availableKeys, zStep, mergeVertical, seed)
+    return score, sizesUsed, getMergeData(window)
+
+
+def getAlignDict(bricksDict, keys):
+    """ parent and size of bricks directly below 'keys' (all getNumAlignedEdges reads from bricksDict) """
+    alignDict = {}
+    for key in keys:
+        x, y, z = getDictLoc(key, bricksDict)
+        k0 = listToStr([x, y, z - 1])
+        if k0 not in bricksDict:
+            continue
+        for k1 in (k0, getParentKey(bricksDict, k0)):
+            if k1 in bricksDict and k1 not in alignDict:
+                alignDict[k1] = {"parent":bricksDict[k1]["parent"], "size":bricksDict[k1]["size"]}
+    return alignDict
+
+
+def getLayerGroups(bricksDict, keysDict, zLevels, maxBrickHeight, mergeVertical=True):
+    """ split 'zLevels' into groups of z levels that can be merged independently (merge groups in order)
+
+    returns list of groups, each a list of (z, keys bricks starting at z may be merged with)
+    """
+    groups = []
+    spans = []
+    for z in zLevels:
+        rows = [z]
+        # tall bricks starting at z need available keys in every z level they cover
+        if mergeVertical and maxBrickHeight > 1 and all(any(not bricksDict[k]["attempted_merge"] for k in keysDict.get(z + ii, [])) for ii in range(1, maxBrickHeight)):
+            rows = [z + ii for ii in range(maxBrickHeight)]
+        # merge after every earlier z level whose bricks may cover the same z levels
+        group = 1 + max([g for z0, z1, g in spans if z0 <= rows[-1] and rows[0] <= z1], default=-1)
+        spans.append((rows[0], rows[-1], group))
+        if group == len(groups):
+            groups.append([])
+        groups[group].append((z, [k for z0 in rows for k in keysDict[z0]]))
+    return groups
+
+
+def setBrickExposures(cm, bricksDict, keys):
+    """ set top and bottom exposure of bricks with parent keys in 'keys' """
+    for key in keys:
+        if bricksDict[key]["parent"] != "self":
+            continue
+        topExposed, botExposed = getBrickExposure(cm, bricksDict, key)
+        bricksDict[key]["top_exposed"] = topExposed
+        bricksDict[key]["bot_exposed"] = botExposed
+
+
+def applyMergeVariation(bricksDict, variation):
+    """ write chosen connectivity variation (BricksDictLayer or merge data from a worker) into bricksDict """
+    if isinstance(variation, BricksDictLayer):
+        variation.writeBack()
+    else:
+        setMergeData(bricksDict, variation)
+
+
 def updateKeysLists(cm, size, loc, availableKeys, key):
     keysChecked = getKeysInBrick(cm, size, key, loc)
-    for k in keysChecked:
-        if k in availableKeys:
-            availableKeys.remove(k)
+    availableKeys.difference_update(keysChecked)
 
 
 def skipThisRow(cm, timeThrough, lowestZ, z):
@@ -242,35 +374,16 @@ def prepareLogoAndGetDetails(scn, cm, logo, dimensions):
     return logo_details, logo
 
 
-def getBrickData(cm, brickD, rand, dimensions, brickSize, undersideDetail, logoToUse, logo_type, logo_details, logo_scale, logo_inset, useStud, circleVerts):
-    # get bm_cache_string
-    bm_cache_string = ""
-    if "CUSTOM" not in cm.brickType:
-        custom_logo_used = logoToUse is not None and logo_type == "CUSTOM"
-        bm_cache_string = json.dumps((cm.brickHeight, brickSize, undersideDetail,
-                                      cm.logoResolution if logoToUse is not None else None,
-                                      cm.logoDecimate if logoToUse is not None else None,
-                                      logo_inset if logoToUse is not None else None,
-                                      hash_object(logoToUse) if custom_logo_used else None,
-                                      logo_scale if custom_logo_used else None,
-                                      logo_type, useStud, cm.circleVerts,
-                                      brickD["type"], cm.loopCut, dimensions["gap"],
-                                      brickD["flipped"] if brickD["type"] in ["SLOPE", "SLOPE_INVERTED"] else None,
-                                      brickD["rotated"] if brickD["type"] in ["SLOPE", "SLOPE_INVERTED"] else None))
-
-    # check for bmesh in cache
-    bms = bricker_bm_cache.get(bm_cache_string)
-    # if not found in bricker_bm_cache, create new brick mesh(es) and store to cache
-    if bms is None:
-        bms = Bricks.new_mesh(dimensions=dimensions, size=brickSize, type=brickD["type"], undersideDetail=undersideDetail, flip=brickD["flipped"], rotate90=brickD["rotated"], logo=logoToUse, logo_type=logo_type, all_vars=logoToUse is not None, logo_details=logo_details, logo_inset=cm.logoInset, stud=useStud, circleVerts=cm.circleVerts, cm=cm)
-        if cm.brickType != "CUSTOM":
-            bricker_bm_cache[bm_cache_string] = bms
+def getBrickData(cm, brickD, rand, dimensions, brickSize, undersideDetail, logoToUse, logo_type, logo_details, logo_scale, logo_inset, useStud, circleVerts, bmKeys=None):
+    bmKeys = bmKeys or BrickMeshKeys(cm, dimensions, logoToUse, logo_type, logo_scale, logo_inset)
+    # get brick bmeshes from cache (or create them)
+    bms, bm_cache_key = getBrickMeshes(cm, brickD, dimensions, brickSize, undersideDetail, logoToUse, logo_type, logo_details, logo_scale, logo_inset, useStud, circleVerts, bmKeys=bmKeys)
 
     # create edit mesh for each bmesh
     meshes = []
+    bmcs_hash = bmKeys.getHash(bm_cache_key)
     for i,bm in enumerate(bms):
         # create new mesh and send bm to it
-        bmcs_hash = hash_str(bm_cache_string)
         meshName = "%(bmcs_hash)s_%(i)s" % locals()
         m = bpy.data.meshes.get(meshName)
         # create new edit mesh and send bmesh data to it
@@ -287,6 +400,65 @@ def getBrickData(cm, brickD, rand, dimensions, brickSize, undersideDetail, logoT
     return m0
 
 
+class BrickMeshKeys():
+    """ brick mesh cache keys for a single build (logo hash and key strings are only computed once) """
+
+    def __init__(self, cm, dimensions, logo, logo_type, logo_scale, logo_inset):
+        self.custom = "CUSTOM" in cm.brickType
+        custom_logo_used = logo is not None and logo_type == "CUSTOM"
+        self.baseKey = (cm.brickHeight, logo_type, cm.circleVerts, cm.loopCut, dimensions["gap"])
+        self.logoKey = (cm.logoResolution, cm.logoDecimate, logo_inset,
+                        hash_object(logo) if custom_logo_used else None,
+                        logo_scale if custom_logo_used else None)
+        self.noLogoKey = (None, None, None, None, None)
+        self.strings = {}
+
+    def getKey(self, brickD, brickSize, undersideDetail, logoToUse, useStud):
+        """ get hashable cache key for brick mesh with these settings """
+        if self.custom:
+            return ""
+        slope = brickD["type"] in ("SLOPE", "SLOPE_INVERTED")
+        return (self.baseKey, tuple(brickSize), undersideDetail, self.noLogoKey if logoToUse is None else self.logoKey,
+                useStud, brickD["type"], brickD["flipped"] if slope else None, brickD["rotated"] if slope else None)
+
+    def getString(self, key):
+        """ get stable string for key (used for the on-disk mesh library) """
+        return self._getStrings(key)[0]
+
+    def getHash(self, key):
+        """ get hash of key string (used for mesh names) """
+        return self._getStrings(key)[1]
+
+    def _getStrings(self, key):
+        strings = self.strings.get(key)
+        if strings is None:
+            keyStr = repr(key) if key else ""
+            strings = self.strings[key] = (keyStr, hash_str(keyStr))
+        return strings
+
+
+def getBrickMeshes(cm, brickD, dimensions, brickSize, undersideDetail, logoToUse, logo_type, logo_details, logo_scale, logo_inset, useStud, circleVerts, bmKeys=None):
+    """ get brick bmesh variations from memory cache or on-disk library, else create them """
+    bmKeys = bmKeys or BrickMeshKeys(cm, dimensions, logoToUse, logo_type, logo_scale, logo_inset)
+    bm_cache_key = bmKeys.getKey(brickD, brickSize, undersideDetail, logoToUse, useStud)
+
+    # check for bmesh in cache
+    bms = bricker_bm_cache.get(bm_cache_key)
+    # if not found in bricker_bm_cache, load brick mesh(es) from library or create new ones, and store to cache
+    if bms is None:
+        useLibrary = cm.brickType != "CUSTOM" and getAddonPrefs().use_mesh_library
+        bms = loadFromMeshLibrary(bmKeys.getString(bm_cache_key)) if useLibrary else None
+        if bms is None:
+            bms = Bricks.new_mesh(dimensions=dimensions, size=brickSize, type=brickD["type"], undersideDetail=undersideDetail, flip=brickD["flipped"], rotate90=brickD["rotated"], logo=logoToUse, logo_type=logo_type, all_vars=logoToUse is not None, logo_details=logo_details, logo_inset=cm.logoInset, stud=useStud, circleVerts=cm.circleVerts, cm=cm)
+            if useLibrary:
+                saveToMeshLibrary(bmKeys.getString(bm_cache_key), bms)
+        if cm.brickType != "CUSTOM":
+            bricker_bm_cache.setMaxBytes(getAddonPrefs().brick_mesh_cache_size * 1024 * 1024)
+            bricker_bm_cache[bm_cache_key] = bms
+
+    return bms, bm_cache_key
+
+
 def getMaterial(cm, bricksDict, key, size, brick_mats=None, seedInc=None):
     mat = None
     highestVal = 0
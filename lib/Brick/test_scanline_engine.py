@@ -0,0 +1,181 @@
+"""
+Copyright (C) 2017 Bricks Brought to Life
+http://bblanimation.com/
+chris@bblanimation.com
+
+Created by Christopher Gearhart
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# checks the NumPy scanline engine against per-ray casting like the ray cast engine (runs without Blender):
+#     python lib/Brick/test_scanline_engine.py
+
+# System imports
+import importlib.util
+import math
+import os
+import numpy as np
+
+# Blender imports
+# NONE!
+
+# Addon imports
+# (loaded by path, since the bricksDict package imports bpy)
+_spec = importlib.util.spec_from_file_location("voxelize", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bricksDict", "voxelize.py"))
+voxelize = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(voxelize)
+
+miniDist = 0.00015
+# scanline rays are nudged ~1e-5 lattice units off the lattice, which moves hits on sloped faces slightly
+hitTolerance = 1e-3
+
+
+def getCubeData(size=(1.03, 0.87, 0.91), center=(0.013, -0.021, 0.008)):
+    """ returns triData (see 'getTriangleData') of box with quad faces """
+    sx, sy, sz = size
+    verts = np.array([(x * sx / 2, y * sy / 2, z * sz / 2) for x in (-1, 1) for y in (-1, 1) for z in (-1, 1)]) + center
+    faces = [(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1), (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)]
+    return getTriData(verts, faces)
+
+
+def getTorusData(majorRadius=0.71, minorRadius=0.29, majorSegs=24, minorSegs=12, center=(0.017, 0.009, -0.013)):
+    """ returns triData (see 'getTriangleData') of torus with quad faces """
+    verts = []
+    for i in range(majorSegs):
+        a = 2 * math.pi * i / majorSegs
+        for j in range(minorSegs):
+            b = 2 * math.pi * j / minorSegs
+            r = majorRadius + minorRadius * math.cos(b)
+            verts.append((r * math.cos(a), r * math.sin(a), minorRadius * math.sin(b)))
+    faces = []
+    for i in range(majorSegs):
+        for j in range(minorSegs):
+            i1, j1 = (i + 1) % majorSegs, (j + 1) % minorSegs
+            faces.append((i * minorSegs + j, i1 * minorSegs + j, i1 * minorSegs + j1, i * minorSegs + j1))
+    return getTriData(np.array(verts) + center, faces)
+
+
+def getTriData(verts, faces):
+    """ triangulate quad faces like 'getTriangleData' (with outward normals from Newell's method) """
+    loopVerts = np.array([v for f in faces for v in f], dtype=np.int32)
+    loopTotals = np.array([len(f) for f in faces], dtype=np.int32)
+    loopStarts = np.cumsum(loopTotals) - loopTotals
+    triCoords, triFaces = voxelize.triangulatePolygons(verts, loopVerts, loopStarts, loopTotals)
+    faceNormals = np.array([sum(np.cross(verts[f[k]], verts[f[(k + 1) % len(f)]]) for k in range(len(f))) for f in faces])
+    faceNormals /= np.linalg.norm(faceNormals, axis=1)[:, None]
+    return triCoords, triFaces, faceNormals
+
+
+def rayCast(triCoords, origin, direction):
+    """ nearest intersection of ray with triangles, like BVHTree.ray_cast (returns (distance, triangle index) or None) """
+    e1 = triCoords[:, 1] - triCoords[:, 0]
+    e2 = triCoords[:, 2] - triCoords[:, 0]
+    p = np.cross(direction, e2)
+    det = (e1 * p).sum(axis=1)
+    valid = np.abs(det) > 1e-12
+    det[~valid] = 1
+    s = origin - triCoords[:, 0]
+    w1 = (s * p).sum(axis=1) / det
+    q = np.cross(s, e1)
+    w2 = (q * direction).sum(axis=1) / det
+    t = (q * e2).sum(axis=1) / det
+    hit = valid & (w1 >= 0) & (w2 >= 0) & (w1 + w2 <= 1) & (t >= 0)
+    if not hit.any():
+        return None
+    tri = np.nonzero(hit)[0][np.argmin(t[hit])]
+    return t[tri], tri
+
+
+def getRayHits(triCoords, origin, direction):
+    """ all intersections of ray from 'origin' as (distance, triangle index), continuing 'miniDist' past each hit like the ray cast engine """
+    hits = []
+    orig = origin
+    while True:
+        hit = rayCast(triCoords, orig, direction)
+        if hit is None:
+            return hits
+        loc = orig + hit[0] * direction
+        hits.append((np.linalg.norm(loc - origin), hit[1]))
+        orig = loc + miniDist * direction
+
+
+def checkAgainstRayCast(triData, origin, step, res):
+    """ compare scanline ray data along each axis with per-ray casting from every lattice coordinate """
+    triCoords, triFaces, faceNormals = triData
+    for axis in range(3):
+        direction = np.zeros(3)
+        direction[axis] = 1
+        rayData = voxelize.castAxisRays(triData, axis, origin, step, res, miniDist=miniDist)
+        outside = voxelize.getOutsideMatrix(rayData, castDoubleCheckRays=False)
+        outsideDoubleCheck = voxelize.getOutsideMatrix(rayData, castDoubleCheckRays=True)
+        for x, y, z in np.ndindex(*res):
+            point = origin + step * (x, y, z)
+            hitsAfter = getRayHits(triCoords, point, direction)
+            hitsBefore = getRayHits(triCoords, point, -direction)
+            assert rayData["countAfter"][x, y, z] == len(hitsAfter), (axis, x, y, z)
+            assert rayData["countBefore"][x, y, z] == len(hitsBefore), (axis, x, y, z)
+            # insideness votes of the ray cast engine ('rayObjIntersections' without normals)
+            assert outside[x, y, z] == (len(hitsAfter) % 2 == 0), (axis, x, y, z)
+            assert outsideDoubleCheck[x, y, z] == (len(hitsAfter) % 2 == 0 or len(hitsBefore) % 2 == 0), (axis, x, y, z)
+            if hitsAfter:
+                nextDir = faceNormals[triFaces[hitsAfter[0][1]], axis]
+                assert math.isclose(rayData["nextDir"][x, y, z], nextDir, abs_tol=1e-6), (axis, x, y, z)
+            # nearest face between coordinate and the next one along axis (used for the brick shell and materials)
+            edgeHits = [hit for hit in hitsAfter if hit[0] <= step[axis] * 1.00001]
+            if edgeHits and [x, y, z][axis] < res[axis] - 1:
+                assert rayData["firstFace"][x, y, z] == triFaces[edgeHits[0][1]], (axis, x, y, z)
+                assert math.isclose(rayData["firstT"][x, y, z], edgeHits[0][0] / step[axis], abs_tol=hitTolerance), (axis, x, y, z)
+                assert rayData["lastFace"][x, y, z] == triFaces[edgeHits[-1][1]], (axis, x, y, z)
+            else:
+                assert rayData["firstFace"][x, y, z] == -1, (axis, x, y, z)
+
+
+def checkRowHits(triData, origin, step, res):
+    """ compare getRowHits with intersections of whole lattice rows cast from before the lattice """
+    triCoords = triData[0]
+    for axis in range(3):
+        u, v = voxelize.perpendicularAxes[axis]
+        rows, hitT, hitTris = voxelize.getRowHits(triCoords, axis, origin, step, res, (0, int(res[v])), miniDist=miniDist)
+        direction = np.zeros(3)
+        direction[axis] = 1
+        for iv in range(res[v]):
+            for iu in range(res[u]):
+                start = origin.copy()
+                start[u] += step[u] * iu
+                start[v] += step[v] * iv
+                start[axis] -= 10
+                expected = [(t - 10) / step[axis] for t, _ in getRayHits(triCoords, start, direction)]
+                row = iv * res[u] + iu
+                assert np.allclose(hitT[rows == row], expected, atol=hitTolerance), (axis, iu, iv)
+
+
+def test_cube():
+    triData = getCubeData()
+    origin, step, res = np.array([-0.61, -0.58, -0.57]), np.array([0.12, 0.11, 0.13]), np.array([11, 11, 10])
+    checkRowHits(triData, origin, step, res)
+    checkAgainstRayCast(triData, origin, step, res)
+
+
+def test_torus():
+    triData = getTorusData()
+    origin, step, res = np.array([-1.07, -1.04, -0.37]), np.array([0.17, 0.16, 0.09]), np.array([14, 14, 9])
+    checkRowHits(triData, origin, step, res)
+    checkAgainstRayCast(triData, origin, step, res)
+
+
+if __name__ == "__main__":
+    test_cube()
+    test_torus()
+    print("scanline engine matches per-ray casting")
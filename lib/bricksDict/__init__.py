@@ -26,7 +26,10 @@ Created by Christopher Gearhart
 # NONE!
 
 # Addon imports
+from .container import *
+from .serialize import *
 from .generate import *
 from .modify import *
+from .optimize import *
 from .functions import *
 from .storage import *
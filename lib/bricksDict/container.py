@@ -0,0 +1,280 @@
+"""
+Copyright (C) 2017 Bricks Brought to Life
+http://bblanimation.com/
+chris@bblanimation.com
+
+Created by Christopher Gearhart
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# System imports
+from collections.abc import Mapping, MutableMapping
+
+# Blender imports
+# NONE!
+
+# Addon imports
+# NONE!
+
+
+entryFields = ("name", "val", "draw", "co", "near_face", "near_intersection", "near_normal", "rgba", "mat_name", "custom_mat_name", "parent", "size", "attempted_merge", "top_exposed", "bot_exposed", "obscures", "type", "flipped", "rotated", "created_from")
+entryFieldSet = frozenset(entryFields)
+
+
+class BrickEntry(MutableMapping):
+    """ fixed-field record for a single bricksDict location (behaves like the dict it replaces) """
+    __slots__ = entryFields + ("loc", "owner")
+
+    def __init__(self, fields=None, loc=None, **kwargs):
+        fields = fields or {}
+        for f in entryFields:
+            setattr(self, f, fields.get(f, kwargs.get(f)))
+        self.loc = loc
+        self.owner = None
+
+    # only entry fields are items ('loc' and 'owner' are attributes), so unknown keys raise KeyError like a dict
+    def __getitem__(self, key):
+        if key not in entryFieldSet:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in entryFieldSet:
+            raise KeyError(key)
+        owner = self.owner
+        if owner is not None and owner.writeLog is not None:
+            owner.logWrite(self)
+        object.__setattr__(self, key, value)
+
+    def __reduce__(self):
+        # leave out the owning bricksDict (e.g. when sent to merge worker processes)
+        return (BrickEntry, (self.toDict(), self.loc))
+
+    def __delitem__(self, key):
+        raise TypeError("bricksDict entry fields can not be removed")
+
+    def __iter__(self):
+        return iter(entryFields)
+
+    def __len__(self):
+        return len(entryFields)
+
+    def __contains__(self, key):
+        return key in entryFieldSet
+
+    def __repr__(self):
+        return repr(self.toDict())
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in entryFieldSet else default
+
+    def keys(self):
+        return list(entryFields)
+
+    def values(self):
+        return [getattr(self, f) for f in entryFields]
+
+    def items(self):
+        return [(f, getattr(self, f)) for f in entryFields]
+
+    def copy(self):
+        return BrickEntry(self, loc=self.loc)
+
+    def toDict(self):
+        """ plain dict of entry fields (for json serialization) """
+        return {f: getattr(self, f) for f in entryFields}
+
+
+class BricksDict(dict):
+    """ dictionary of BrickEntry records keyed by 'x,y,z' strings
+
+    Keys stay strings so existing caches, brick object names and customize
+    tools keep working unchanged; each entry carries its integer (x, y, z)
+    location in 'loc' so hot loops never need to parse the key.
+
+    While 'writeLog' is recording (see startWriteLog), the values each key had
+    before its first write are kept, so undo states only store touched entries.
+    """
+    writeLog = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.update(*args, **kwargs)
+
+    def __setitem__(self, key, entry):
+        if type(entry) is not BrickEntry:
+            entry = BrickEntry(entry)
+        if entry.loc is None:
+            entry.loc = tuple(map(int, key.split(",")))
+        if entry.owner is None:
+            entry.owner = self
+        if self.writeLog is not None:
+            self.logKey(key)
+        dict.__setitem__(self, key, entry)
+
+    def __delitem__(self, key):
+        if self.writeLog is not None:
+            self.logKey(key)
+        dict.__delitem__(self, key)
+
+    def pop(self, key, *args):
+        if self.writeLog is not None:
+            self.logKey(key)
+        return dict.pop(self, key, *args)
+
+    def update(self, *args, **kwargs):
+        for key, entry in dict(*args, **kwargs).items():
+            self[key] = entry
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def copy(self):
+        return BricksDict({key: entry.copy() for key, entry in self.items()})
+
+    def getLoc(self, key):
+        """ integer (x, y, z) location of entry at 'key' """
+        return dict.__getitem__(self, key).loc
+
+    @staticmethod
+    def getKey(x, y, z):
+        return "{x},{y},{z}".format(x=x, y=y, z=z)
+
+    def at(self, x, y, z):
+        """ entry at integer location (x, y, z) """
+        return dict.__getitem__(self, self.getKey(x, y, z))
+
+    def toDict(self):
+        """ plain dict of dicts (for json serialization) """
+        return {key: entry.toDict() for key, entry in self.items()}
+
+    def startWriteLog(self):
+        """ start recording pre-edit values of entries as they are written """
+        self.writeLog = {}
+        return self.writeLog
+
+    def stopWriteLog(self):
+        """ stop recording and return {key: pre-edit entry values (None if key was added)} """
+        writeLog = self.writeLog
+        self.writeLog = None
+        return writeLog
+
+    def logKey(self, key):
+        """ record pre-edit values of entry at 'key' if not recorded yet """
+        if key not in self.writeLog:
+            entry = dict.get(self, key)
+            self.writeLog[key] = None if entry is None else tuple(entry.values())
+
+    def logWrite(self, entry):
+        """ record pre-edit values of 'entry' if it is still stored in this bricksDict """
+        key = self.getKey(*entry.loc)
+        if key not in self.writeLog and dict.get(self, key) is entry:
+            self.writeLog[key] = tuple(entry.values())
+
+    @classmethod
+    def fromDict(cls, bricksDict):
+        """ wrap plain dict of dicts (e.g. from json.loads) in a BricksDict """
+        return bricksDict if isinstance(bricksDict, cls) else cls(bricksDict)
+
+
+def isBricksDict(d):
+    """ check if 'd' maps location keys to entries (rather than frames to bricksDicts) """
+    for entry in d.values():
+        return isinstance(entry, Mapping) and "name" in entry
+    return True
+
+
+def wrapBricksDicts(d):
+    """ wrap bricksDict (or dict of animated frame bricksDicts) loaded from a cache """
+    if isBricksDict(d):
+        return BricksDict.fromDict(d)
+    return {frame: BricksDict.fromDict(bricksDict) for frame, bricksDict in d.items()}
+
+
+mergeFields = ("parent", "size", "attempted_merge", "top_exposed", "bot_exposed", "type", "flipped", "rotated")
+mergeFieldSet = frozenset(mergeFields)
+
+
+class LayerEntry(MutableMapping):
+    """ scratch copy of the fields attemptMerge writes; all other fields are read from the base entry """
+    __slots__ = mergeFields + ("base",)
+
+    def __init__(self, base):
+        self.base = base
+        for f in mergeFields:
+            setattr(self, f, base[f])
+
+    def __getitem__(self, key):
+        return getattr(self, key) if key in mergeFieldSet else self.base[key]
+
+    def __setitem__(self, key, value):
+        if key not in mergeFieldSet:
+            raise KeyError("'%(key)s' can not be changed in a merge variation" % locals())
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        raise TypeError("bricksDict entry fields can not be removed")
+
+    def __iter__(self):
+        return iter(entryFields)
+
+    def __len__(self):
+        return len(entryFields)
+
+    def __contains__(self, key):
+        return key in entryFieldSet
+
+    @property
+    def loc(self):
+        return getattr(self.base, "loc", None)
+
+    def writeBack(self):
+        """ copy merge fields back into the base entry """
+        base = self.base
+        for f in mergeFields:
+            base[f] = getattr(self, f)
+
+
+class BricksDictLayer(dict):
+    """ merge variation of the bricksDict entries at 'keys' (used to test connectivity without copying the bricksDict) """
+
+    def __init__(self, bricksDict, keys):
+        super().__init__()
+        for key in keys:
+            dict.__setitem__(self, key, LayerEntry(bricksDict[key]))
+
+    def getLoc(self, key):
+        return dict.__getitem__(self, key).loc
+
+    def writeBack(self):
+        """ apply this variation to the underlying bricksDict """
+        for entry in self.values():
+            entry.writeBack()
+
+
+def getMergeData(bricksDict, keys=None):
+    """ compact {key: merge field values} for entries at 'keys' (e.g. to return a merge variation from a worker process) """
+    keys = bricksDict.keys() if keys is None else keys
+    return {key: tuple(bricksDict[key][f] for f in mergeFields) for key in keys}
+
+
+def setMergeData(bricksDict, mergeData):
+    """ write merge field values from getMergeData back into bricksDict """
+    for key, values in mergeData.items():
+        entry = bricksDict[key]
+        for f, value in zip(mergeFields, values):
+            entry[f] = value
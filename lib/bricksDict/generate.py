@@ -32,6 +32,10 @@ from mathutils import Matrix, Vector
 
 # Addon imports
 from .functions import *
+from .container import *
+from .voxelize import *
+from .raycast import *
+from ..caches import bricker_source_mesh_cache, bricker_voxel_cache
 from ...functions.common import *
 from ...functions.general import *
 from ...functions.generate_lattice import generateLattice
@@ -40,6 +44,11 @@ from ...functions.smoke_sim import *
 from ..Brick import Bricks
 from bpy.types import Object
 
+# brickFreqMatrix is an int8 array of 'val' in hundredths (see 'getBFMVal')
+bfmShell = 100
+bfmInside = -100
+bfmRemoved = -128
+
 def VectorRound(vec, dec, roundType="ROUND"):
     """ round all vals in Vector 'vec' to 'dec' precision """
     if roundType == "ROUND":
@@ -50,15 +59,19 @@ def VectorRound(vec, dec, roundType="ROUND"):
         lst = [(math.ceil(vec[i] * 10**dec)) / 10**dec for i in range(len(vec))]
     return Vector(lst)
 
-def castRays(obj:Object, point:Vector, direction:Vector, miniDist:float, roundType:str="CEILING", edgeLen:int=0):
+def castRays(bvh, point:Vector, direction:Vector, miniDist:Vector, edgeLen:int=0):
     """
-    obj       -- source object to test intersections for
+    bvh       -- BVH tree of source object to test intersections for
     point     -- origin point for ray casting
     direction -- cast ray in this direction
     miniDist  -- Vector with miniscule amount to add after intersection
-    roundType -- round final intersection location Vector with this type
     edgeLen   -- distance to test for intersections
     """
+    hits = getRayHits(bvh, point, direction, miniDist)
+    return getHitInfo(hits, direction, edgeLen)
+
+def getHitInfo(hits, direction:Vector, edgeLen:int=0):
+    """ get intersection info from list of ray intersections (see 'getRayHits') """
     # initialize variables
     firstDirection = False
     firstIntersection = None
@@ -66,34 +79,27 @@ def castRays(obj:Object, point:Vector, direction:Vector, miniDist:float, roundTy
     lastIntersection = None
     edgeIntersects = False
     edgeLen2 = edgeLen*1.00001
-    orig = point
-    intersections = 0
-    # cast rays until no more rays to cast
-    while True:
-        _,location,normal,index = obj.ray_cast(orig,direction)#distance=edgeLen*1.00000000001)
-        if index == -1: break
-        if intersections == 0:
-            firstDirection = direction.dot(normal)
-        if edgeLen != 0:
-            # get first and last intersection (used when getting materials of nearest (first or last intersected) face)
-            if (location-point).length <= edgeLen2:
-                if intersections == 0:
-                    edgeIntersects = True
-                    firstIntersection = {"idx":index, "dist":(location-point).length, "loc":location, "normal":normal}
-                lastIntersection = {"idx":index, "dist":edgeLen - (location-point).length, "loc":location, "normal":normal}
-
-            # set nextIntersection
-            if nextIntersection is None:
-                nextIntersection = location.copy()
-        intersections += 1
-        location = VectorRound(location, 5, roundType=roundType)
-        orig = location + miniDist
+    intersections = len(hits)
+    if intersections > 0:
+        firstDirection = direction.dot(hits[0][1])
+    if edgeLen != 0 and intersections > 0:
+        # get first and last intersection (used when getting materials of nearest (first or last intersected) face)
+        for location, normal, index, dist in hits:
+            if dist > edgeLen2:
+                break
+            if not edgeIntersects:
+                edgeIntersects = True
+                firstIntersection = {"idx":index, "dist":dist, "loc":location, "normal":normal}
+            lastIntersection = {"idx":index, "dist":edgeLen - dist, "loc":location, "normal":normal}
+        # set nextIntersection
+        nextIntersection = hits[0][0].copy()
 
     return intersections, firstDirection, firstIntersection, nextIntersection, lastIntersection, edgeIntersects
 
-def rayObjIntersections(scn, cm, point, direction, miniDist:Vector, edgeLen, obj):
+def rayObjIntersections(scn, cm, point, direction, miniDist:Vector, edgeLen, bvh, inside=None):
     """
     cast ray(s) from point in direction to determine insideness and whether edge intersects obj within edgeLen
+    (insideness calculations are skipped if 'inside' is passed)
 
     returned:
     - not outside       - 'point' is inside object 'obj'
@@ -106,8 +112,6 @@ def rayObjIntersections(scn, cm, point, direction, miniDist:Vector, edgeLen, obj
     """
 
     # initialize variables
-    intersections = 0
-    noMoreChecks = False
     outsideL = []
     # set axis of direction
     if direction[0] > 0:
@@ -116,38 +120,34 @@ def rayObjIntersections(scn, cm, point, direction, miniDist:Vector, edgeLen, obj
         axes = "YZX"
     else:
         axes = "ZXY"
-    # run initial intersection check
-    intersections, firstDirection, firstIntersection, nextIntersection, lastIntersection, edgeIntersects = castRays(obj, point, direction, miniDist, edgeLen=edgeLen)
-    if cm.insidenessRayCastDir == "HIGH EFFICIENCY" or axes[0] in cm.insidenessRayCastDir:
+    # get directions of rays to cast for insideness checks
+    dir0 = Vector((direction[2], direction[0], direction[1]))
+    dir1 = Vector((direction[1], direction[2], direction[0]))
+    miniDist0 = Vector((miniDist[2], miniDist[0], miniDist[1]))
+    miniDist1 = Vector((miniDist[1], miniDist[2], miniDist[0]))
+    rays = [[direction, miniDist]]
+    if inside is None and cm.insidenessRayCastDir not in ["HIGH EFFICIENCY", "WINDING NUMBER"]:
+        rays += [ray for i, ray in enumerate([[dir0, miniDist0], [dir1, miniDist1]]) if axes[i+1] in cm.insidenessRayCastDir]
+    # cast all rays from point and get every intersection
+    allHits = castRayBatch(bvh, [point]*len(rays), [ray[0] for ray in rays], [ray[1] for ray in rays])
+    # get intersection info for initial ray
+    intersections, firstDirection, firstIntersection, nextIntersection, lastIntersection, edgeIntersects = getHitInfo(allHits[0], direction, edgeLen=edgeLen)
+    if inside is not None:
+        return inside, edgeIntersects, intersections, nextIntersection, firstIntersection, lastIntersection
+    for i, (curDirection, curMiniDist) in enumerate(rays):
+        # winding numbers need the source triangles (see 'isInsideSource'), so fall back to the initial ray here
+        if i == 0 and not (cm.insidenessRayCastDir in ["HIGH EFFICIENCY", "WINDING NUMBER"] or axes[0] in cm.insidenessRayCastDir):
+            continue
         outsideL.append(0)
-        if intersections%2 == 0 and not (cm.useNormals and firstDirection > 0):
-            outsideL[0] = 1
+        count = len(allHits[i])
+        firstDirection = curDirection.dot(allHits[i][0][1]) if count > 0 else False
+        if count%2 == 0 and not (cm.useNormals and firstDirection > 0):
+            outsideL[len(outsideL) - 1] = 1
         elif cm.castDoubleCheckRays:
             # double check vert is inside mesh
-            count, firstDirection,_,_,_,_ = castRays(obj, point, -direction, -miniDist, roundType="FLOOR")
+            count, firstDirection,_,_,_,_ = castRays(bvh, point, -curDirection, -curMiniDist)
             if count%2 == 0 and not (cm.useNormals and firstDirection > 0):
-                outsideL[0] = 1
-
-    # run more checks
-    if cm.insidenessRayCastDir != "HIGH EFFICIENCY":
-        dir0 = Vector((direction[2], direction[0], direction[1]))
-        dir1 = Vector((direction[1], direction[2], direction[0]))
-        miniDist0 = Vector((miniDist[2], miniDist[0], miniDist[1]))
-        miniDist1 = Vector((miniDist[1], miniDist[2], miniDist[0]))
-        dirs = [[dir0, miniDist0], [dir1, miniDist1]]
-        for i in range(2):
-            if axes[i+1] in cm.insidenessRayCastDir:
-                outsideL.append(0)
-                direction = dirs[i][0]
-                miniDist = dirs[i][1]
-                count, firstDirection,_,_,_,_ = castRays(obj, point, direction, miniDist)
-                if count%2 == 0 and not (cm.useNormals and firstDirection > 0):
-                    outsideL[len(outsideL) - 1] = 1
-                elif cm.castDoubleCheckRays:
-                    # double check vert is inside mesh
-                    count, firstDirection,_,_,_,_ = castRays(obj, point, -direction, -miniDist, roundType="FLOOR")
-                    if count%2 == 0 and not (cm.useNormals and firstDirection > 0):
-                        outsideL[len(outsideL) - 1] = 1
+                outsideL[len(outsideL) - 1] = 1
 
     # find average of outsideL and set outside accordingly (<0.5 is False, >=0.5 is True)
     outside = sum(outsideL)/len(outsideL) >= 0.5
@@ -155,31 +155,31 @@ def rayObjIntersections(scn, cm, point, direction, miniDist:Vector, edgeLen, obj
     # return helpful information
     return not outside, edgeIntersects, intersections, nextIntersection, firstIntersection, lastIntersection
 
-def updateBFMatrix(scn, cm, x0, y0, z0, coordMatrix, faceIdxMatrix, brickFreqMatrix, brickShell, source, x1, y1, z1, miniDist, inside=None):
+def updateBFMatrix(scn, cm, x0, y0, z0, coordMatrix, faceIdxMatrix, brickFreqMatrix, brickShell, bvh, x1, y1, z1, miniDist, inside=None):
     """ update brickFreqMatrix[x0][y0][z0] based on results from rayObjIntersections """
-    orig = coordMatrix[x0][y0][z0]
+    orig = coordMatrix.coord(x0, y0, z0)
     try:
-        rayEnd = coordMatrix[x1][y1][z1]
+        rayEnd = coordMatrix.coord(x1, y1, z1)
     except IndexError:
         return -1, None, True
     # check if point can be thrown away
     ray = rayEnd - orig
     edgeLen = ray.length
 
-    origInside, edgeIntersects, intersections, nextIntersection, firstIntersection, lastIntersection = rayObjIntersections(scn, cm, orig, ray, miniDist, edgeLen, source)
-    if origInside and brickFreqMatrix[x0][y0][z0] == 0:
+    origInside, edgeIntersects, intersections, nextIntersection, firstIntersection, lastIntersection = rayObjIntersections(scn, cm, orig, ray, miniDist, edgeLen, bvh, inside=inside)
+    if origInside and brickFreqMatrix[x0, y0, z0] == 0:
         # define brick as inside shell
-        brickFreqMatrix[x0][y0][z0] = -1
+        brickFreqMatrix[x0, y0, z0] = bfmInside
     if edgeIntersects:
         if (origInside and brickShell == "INSIDE") or (not origInside and brickShell == "OUTSIDE") or brickShell == "INSIDE AND OUTSIDE":
             # define brick as part of shell
-            brickFreqMatrix[x0][y0][z0] = 1
+            brickFreqMatrix[x0, y0, z0] = bfmShell
             # set or update nearest face to brick
             if type(faceIdxMatrix[x0][y0][z0]) != dict or faceIdxMatrix[x0][y0][z0]["dist"] > firstIntersection["dist"]:
                 faceIdxMatrix[x0][y0][z0] = firstIntersection
         if (not origInside and brickShell == "INSIDE") or (origInside and brickShell == "OUTSIDE") or brickShell == "INSIDE AND OUTSIDE":
             # define brick as part of shell
-            brickFreqMatrix[x1][y1][z1] = 1
+            brickFreqMatrix[x1, y1, z1] = bfmShell
             # set or update nearest face to brick
             if type(faceIdxMatrix[x1][y1][z1]) != dict or faceIdxMatrix[x1][y1][z1]["dist"] > lastIntersection["dist"]:
                 faceIdxMatrix[x1][y1][z1] = lastIntersection
@@ -199,7 +199,7 @@ def addColumnSupports(cm, bricksDict, keys):
     """
     step = cm.colStep + cm.colThickness
     for key in keys:
-        x,y,z = strToList(key)
+        x,y,z = getDictLoc(key, bricksDict)
         if (x % step in range(cm.colThickness) and
             y % step in range(cm.colThickness) and
             isInternal(bricksDict, key)
@@ -214,7 +214,7 @@ def addLatticeSupports(cm, bricksDict, keys):
     """
     step = cm.latticeStep
     for key in keys:
-        x,y,z = strToList(key)
+        x,y,z = getDictLoc(key, bricksDict)
         if x % step == 0 and (not cm.alternateXY or z % 2 == 0):
             if isInternal(bricksDict, key):
                 bricksDict[key]["draw"] = True
@@ -249,10 +249,24 @@ def updateInternal(bricksDict, cm, keys="ALL", clearExisting=False):
 def getBrickMatrix(source, faceIdxMatrix, coordMatrix, brickShell, axes="xyz", cursorStatus=False):
     """ returns new brickFreqMatrix """
     scn, cm, _ = getActiveContextInfo()
-    brickFreqMatrix = deepcopy(faceIdxMatrix)
+    brickFreqMatrix = newBrickFreqMatrix(faceIdxMatrix)
     axes = axes.lower()
-    dist = coordMatrix[1][1][1] - coordMatrix[0][0][0]
+    bvh = getBVHTree(source, scn)
+    dist = coordMatrix.step
+    xCoords, yCoords, zCoords = (coordMatrix.axisCoords(axis).tolist() for axis in range(3))
     highEfficiency = cm.insidenessRayCastDir in ["HIGH EFFICIENCY", "XYZ"] and not cm.verifyExposure
+    # get insideness of every lattice location at once from generalized winding numbers
+    insideMatrix = None
+    windingTree = None
+    if cm.insidenessRayCastDir == "WINDING NUMBER":
+        triCoords = getSourceTriangleData(source)[0]
+        windingTree = buildWindingTree(triCoords)
+        origin, step, res = getLatticeInfo(coordMatrix)
+        insideMatrix = getLatticeWindingNumbers(triCoords, origin, step, res, tree=windingTree) >= 0.5
+    # classify blocks of lattice locations away from source surface all at once
+    uniform = getUniformBlocks(scn, cm, bvh, coordMatrix, windingData=None if windingTree is None else (triCoords, windingTree)) if cm.useOctree else None
+    if uniform is not None:
+        brickFreqMatrix[uniform == 1] = bfmInside
 
     # initialize values used for printing status
     denom = (len(brickFreqMatrix[0][0]) + len(brickFreqMatrix[0]) + len(brickFreqMatrix))/100
@@ -276,13 +290,16 @@ def getBrickMatrix(source, faceIdxMatrix, coordMatrix, brickShell, axes="xyz", c
                 nextIntersection = None
                 i = 0
                 for x in range(len(brickFreqMatrix)):
+                    # skip locations in blocks already classified by octree
+                    if uniform is not None and uniform[x, y, z] != 0:
+                        continue
                     # skip current loc if casting ray is unnecessary (sets outside vals to last found val)
-                    if i == 2 and highEfficiency and nextIntersection is not None and coordMatrix[x][y][z].x + dist.x + miniDist.x < nextIntersection.x:
-                        brickFreqMatrix[x][y][z] = val
+                    if i == 2 and highEfficiency and nextIntersection is not None and xCoords[x] + dist.x + miniDist.x < nextIntersection.x:
+                        brickFreqMatrix[x, y, z] = val
                         continue
-                    intersections, nextIntersection, edgeIntersects = updateBFMatrix(scn, cm, x, y, z, coordMatrix, faceIdxMatrix, brickFreqMatrix, brickShell, source, x+1, y, z, miniDist)
+                    intersections, nextIntersection, edgeIntersects = updateBFMatrix(scn, cm, x, y, z, coordMatrix, faceIdxMatrix, brickFreqMatrix, brickShell, bvh, x+1, y, z, miniDist, inside=None if insideMatrix is None else bool(insideMatrix[x, y, z]))
                     i = 0 if edgeIntersects else (2 if i == 1 else 1)
-                    val = brickFreqMatrix[x][y][z]
+                    val = brickFreqMatrix[x, y, z]
                     if intersections == 0:
                         break
 
@@ -296,15 +313,18 @@ def getBrickMatrix(source, faceIdxMatrix, coordMatrix, brickShell, axes="xyz", c
                 nextIntersection = None
                 i = 0
                 for y in range(len(brickFreqMatrix[0])):
+                    # skip locations in blocks already classified by octree
+                    if uniform is not None and uniform[x, y, z] != 0:
+                        continue
                     # skip current loc if casting ray is unnecessary (sets outside vals to last found val)
-                    if i == 2 and highEfficiency and nextIntersection is not None and coordMatrix[x][y][z].y + dist.y + miniDist.y < nextIntersection.y:
-                        if brickFreqMatrix[x][y][z] == 0:
-                            brickFreqMatrix[x][y][z] = val
-                        if brickFreqMatrix[x][y][z] == val:
+                    if i == 2 and highEfficiency and nextIntersection is not None and yCoords[y] + dist.y + miniDist.y < nextIntersection.y:
+                        if brickFreqMatrix[x, y, z] == 0:
+                            brickFreqMatrix[x, y, z] = val
+                        if brickFreqMatrix[x, y, z] == val:
                             continue
-                    intersections, nextIntersection, edgeIntersects = updateBFMatrix(scn, cm, x, y, z, coordMatrix, faceIdxMatrix, brickFreqMatrix, brickShell, source, x, y+1, z, miniDist)
+                    intersections, nextIntersection, edgeIntersects = updateBFMatrix(scn, cm, x, y, z, coordMatrix, faceIdxMatrix, brickFreqMatrix, brickShell, bvh, x, y+1, z, miniDist, inside=None if insideMatrix is None else bool(insideMatrix[x, y, z]))
                     i = 0 if edgeIntersects else (2 if i == 1 else 1)
-                    val = brickFreqMatrix[x][y][z]
+                    val = brickFreqMatrix[x, y, z]
                     if intersections == 0:
                         break
 
@@ -318,16 +338,19 @@ def getBrickMatrix(source, faceIdxMatrix, coordMatrix, brickShell, axes="xyz", c
                 nextIntersection = None
                 i = 0
                 for z in range(len(brickFreqMatrix[0][0])):
+                    # skip locations in blocks already classified by octree
+                    if uniform is not None and uniform[x, y, z] != 0:
+                        continue
                     # skip current loc if casting ray is unnecessary (sets outside vals to last found val)
-                    if i == 2 and highEfficiency and nextIntersection is not None and coordMatrix[x][y][z].z + dist.z + miniDist.z < nextIntersection.z:
-                        if brickFreqMatrix[x][y][z] == 0:
-                            brickFreqMatrix[x][y][z] = val
-                        if brickFreqMatrix[x][y][z] == val:
+                    if i == 2 and highEfficiency and nextIntersection is not None and zCoords[z] + dist.z + miniDist.z < nextIntersection.z:
+                        if brickFreqMatrix[x, y, z] == 0:
+                            brickFreqMatrix[x, y, z] = val
+                        if brickFreqMatrix[x, y, z] == val:
                             continue
                     # cast rays and update brickFreqMatrix
-                    intersections, nextIntersection, edgeIntersects = updateBFMatrix(scn, cm, x, y, z, coordMatrix, faceIdxMatrix, brickFreqMatrix, brickShell, source, x, y, z+1, miniDist)
+                    intersections, nextIntersection, edgeIntersects = updateBFMatrix(scn, cm, x, y, z, coordMatrix, faceIdxMatrix, brickFreqMatrix, brickShell, bvh, x, y, z+1, miniDist, inside=None if insideMatrix is None else bool(insideMatrix[x, y, z]))
                     i = 0 if edgeIntersects else (2 if i == 1 else 1)
-                    val = brickFreqMatrix[x][y][z]
+                    val = brickFreqMatrix[x, y, z]
                     if intersections == 0:
                         break
 
@@ -343,10 +366,100 @@ def getBrickMatrix(source, faceIdxMatrix, coordMatrix, brickShell, axes="xyz", c
     return brickFreqMatrix
 
 
+def isInsideSource(scn, cm, bvh, point:Vector, dist:Vector, windingData=None):
+    """ returns True if 'point' is inside source (based on insideness settings in 'cm') """
+    if windingData is not None:
+        triCoords, windingTree = windingData
+        return getWindingNumbers(triCoords, windingTree, np.array([point]))[0] >= 0.5
+    return rayObjIntersections(scn, cm, point, Vector((dist.x, 0, 0)), Vector((0.00015, 0, 0)), 0, bvh)[0]
+
+def getUniformBlocks(scn, cm, bvh, coordMatrix, minSize=2, windingData=None):
+    """ returns int8 matrix classifying lattice locations with octree (0: near source surface, 1: inside, 2: outside)
+
+    Keyword arguments:
+    bvh         -- BVH tree of source object
+    coordMatrix -- lattice of coordinates to classify
+    minSize     -- blocks smaller than this along every axis are not subdivided further
+    windingData -- (triCoords, windingTree) for insideness from generalized winding numbers
+
+    """
+    uniform = np.zeros(coordMatrix.shape, dtype=np.int8)
+    dist = coordMatrix.step
+    blocks = [((0, 0, 0), coordMatrix.shape)]
+    while len(blocks) > 0:
+        start, end = blocks.pop()
+        size = Vector(end) - Vector(start)
+        # get region covered by block and edges to next locations along each axis
+        lo = coordMatrix.coord(*start)
+        hi = lo + vec_mult(size, dist)
+        center = (lo + hi) / 2
+        radius = (hi - lo).length / 2 + 0.00015
+        # classify whole block if source surface doesn't pass through it
+        if bvh.find_nearest(center, radius)[0] is None:
+            idxs = tuple(slice(s, e) for s, e in zip(start, end))
+            uniform[idxs] = 1 if isInsideSource(scn, cm, bvh, center, dist, windingData=windingData) else 2
+            continue
+        # subdivide block into octants
+        if max(size) < minSize:
+            continue
+        splits = [(s, (s + e) // 2, e) if e - s > 1 else (s, e) for s, e in zip(start, end)]
+        for xs in zip(splits[0][:-1], splits[0][1:]):
+            for ys in zip(splits[1][:-1], splits[1][1:]):
+                for zs in zip(splits[2][:-1], splits[2][1:]):
+                    blocks.append(((xs[0], ys[0], zs[0]), (xs[1], ys[1], zs[1])))
+    return uniform
+
+def getSourceTriangleData(source):
+    """ returns triangle data of 'source' (extracted once and reused until 'source' changes) """
+    sourceHash = hash_object(source)
+    cached = bricker_source_mesh_cache.get(source.name)
+    if cached is not None and cached[0] == sourceHash:
+        return cached[1]
+    triData = getTriangleData(source)
+    bricker_source_mesh_cache[source.name] = (sourceHash, triData)
+    return triData
+
+def getBrickMatrixScanline(source, faceIdxMatrix, coordMatrix, brickShell, axes="xyz", cursorStatus=False):
+    """ returns new brickFreqMatrix (computes intersections for whole lattice rows at once with NumPy) """
+    scn, cm, _ = getActiveContextInfo()
+    if cursorStatus:
+        wm = bpy.context.window_manager
+        wm.progress_begin(0, 100)
+
+    def printStatus(percent):
+        # print status to terminal
+        updateProgressBars(True, cursorStatus, percent, 0, "Shell")
+
+    # get triangles of source mesh and lattice info as numpy arrays
+    triData = getSourceTriangleData(source)
+    origin, step, res = getLatticeInfo(coordMatrix)
+    # compute brickFreqMatrix and nearest face intersections
+    bfm, faceIdxs, faceDists, faceAxes, faceOffsets = getBrickFreqArrays(triData, origin, step, res, axes=axes, insidenessRayCastDir=cm.insidenessRayCastDir, useNormals=cm.useNormals, castDoubleCheckRays=cm.castDoubleCheckRays, brickShell=brickShell, statusCallback=printStatus, numProcesses=getAddonPrefs().matrix_processes)
+    # store nearest face intersections in faceIdxMatrix
+    faceNormals = triData[2]
+    for x, y, z in zip(*np.nonzero(faceIdxs != -1)):
+        idx = int(faceIdxs[x, y, z])
+        loc = coordMatrix.coord(x, y, z)
+        loc[int(faceAxes[x, y, z])] += float(faceOffsets[x, y, z])
+        faceIdxMatrix[x][y][z] = {"idx":idx, "dist":float(faceDists[x, y, z]), "loc":loc, "normal":Vector(faceNormals[idx])}
+    brickFreqMatrix = bfm * np.int8(bfmShell)
+
+    # mark inside freqs as internal (-1) and outside next to outsides for removal
+    adjustBFM(brickFreqMatrix, axes=axes.lower())
+
+    # print status to terminal
+    updateProgressBars(True, cursorStatus, 1, 0, "Shell", end=True)
+
+    # update internals of brickFreqMatrix
+    updateInternals(brickFreqMatrix, cm=cm, faceIdxMatrix=faceIdxMatrix)
+
+    return brickFreqMatrix
+
+
 def getBrickMatrixSmoke(source, faceIdxMatrix, brickShell, source_details, cursorStatus=False):
     scn, cm, _ = getActiveContextInfo()
     density_grid, flame_grid, color_grid, domain_res, max_res, adapt = getSmokeInfo(source)
-    brickFreqMatrix = deepcopy(faceIdxMatrix)
+    brickFreqMatrix = newBrickFreqMatrix(faceIdxMatrix)
     colorMatrix = deepcopy(faceIdxMatrix)
     old_percent = 0
     brightness = Vector([(cm.smokeBrightness - 1) / 5]*3)
@@ -432,11 +545,11 @@ def getBrickMatrixSmoke(source, faceIdxMatrix, brickShell, source_details, curso
                 c_ave += brightness
                 # add saturation
                 c_ave = c_ave * sat_mat
-                brickFreqMatrix[x][y][z] = 0 if alpha < (1 - cm.smokeDensity) else 1
+                brickFreqMatrix[x, y, z] = 0 if alpha < (1 - cm.smokeDensity) else bfmShell
                 colorMatrix[x][y][z] = list(c_ave) + [alpha]
 
     # mark inside freqs as internal (-1) and outside next to outsides for removal
-    adjustBFM(brickFreqMatrix, False)
+    adjustBFM(brickFreqMatrix)
 
     # end progress bar
     updateProgressBars(True, cursorStatus, 1, 0, "Shell", end=True)
@@ -447,110 +560,99 @@ def getBrickMatrixSmoke(source, faceIdxMatrix, brickShell, source_details, curso
     return brickFreqMatrix, colorMatrix
 
 
+def newBrickFreqMatrix(faceIdxMatrix):
+    """ returns empty brickFreqMatrix with shape of 'faceIdxMatrix' """
+    return np.zeros((len(faceIdxMatrix), len(faceIdxMatrix[0]), len(faceIdxMatrix[0][0])), dtype=np.int8)
+
+def getBFMVal(code):
+    """ returns brickFreqMatrix 'val' stored as 'code' (None if location was removed) """
+    return None if code == bfmRemoved else round(int(code) / 100, 2)
+
+def shiftMatrix(mask, axis, offset, fill=False):
+    """ returns boolean 'mask' with values of neighbors 'offset' (1 or -1) along 'axis' (out of bounds neighbors set to 'fill') """
+    shifted = np.full(mask.shape, fill, dtype=bool)
+    src = [slice(None)] * 3
+    dst = [slice(None)] * 3
+    src[axis] = slice(1, None) if offset > 0 else slice(0, -1)
+    dst[axis] = slice(0, -1) if offset > 0 else slice(1, None)
+    shifted[tuple(dst)] = mask[tuple(src)]
+    return shifted
+
 def adjustBFM(brickFreqMatrix, axes=""):
     """ adjust brickFreqMatrix values """
-    xL = len(brickFreqMatrix)
-    yL = len(brickFreqMatrix[0])
-    zL = len(brickFreqMatrix[0][0])
-    for x in range(xL):
-        for y in range(yL):
-            for z in range(zL):
-                # if current location is inside (-1) and adjacent location is out of bounds, current location is shell (1)
-                if (brickFreqMatrix[x][y][z] == -1 and
-                    (("z" not in axes and
-                      (z in [0, zL-1] or
-                       brickFreqMatrix[x][y][z+1] == 0 or
-                       brickFreqMatrix[x][y][z-1] == 0)) or
-                     ("y" not in axes and
-                      (y in [0, yL-1] or
-                       brickFreqMatrix[x][y+1][z] == 0 or
-                       brickFreqMatrix[x][y-1][z] == 0)) or
-                     ("x" not in axes and
-                      (x in [0, xL-1] or
-                       brickFreqMatrix[x+1][y][z] == 0 or
-                       brickFreqMatrix[x-1][y][z] == 0))
-                  )):
-                    brickFreqMatrix[x][y][z] = 1
-                    # TODO: set faceIdxMatrix value to nearest shell value using some sort of built in nearest poly to point function
-                # continue if curLoc is boundary loc
-                if (x in [0, xL-1] or y in [0, yL-1] or z in [0, zL-1]):
-                    continue
-                # # If inside location (-1) intersects outside location (0), make it ouside (0)
-                # if (brickFreqMatrix[x][y][z] == -1 and
-                #     (brickFreqMatrix[x+1][y][z] == 0 or
-                #      brickFreqMatrix[x-1][y][z] == 0 or
-                #      brickFreqMatrix[x][y+1][z] == 0 or
-                #      brickFreqMatrix[x][y-1][z] == 0 or
-                #      brickFreqMatrix[x][y][z+1] == 0 or
-                #      brickFreqMatrix[x][y][z-1] == 0)):
-                #     brickFreqMatrix[x][y][z] = 0
-                # If shell location (1) does not intersect outside location (0), make it inside (-1)
-                if (brickFreqMatrix[x][y][z] == 1 and
-                    brickFreqMatrix[x+1][y][z] != 0 and
-                    brickFreqMatrix[x-1][y][z] != 0 and
-                    brickFreqMatrix[x][y+1][z] != 0 and
-                    brickFreqMatrix[x][y-1][z] != 0 and
-                    brickFreqMatrix[x][y][z+1] != 0 and
-                    brickFreqMatrix[x][y][z-1] != 0):
-                    brickFreqMatrix[x][y][z] = -1
+    outside = brickFreqMatrix == 0
+    # if current location is inside (-1) and adjacent location is out of bounds or outside along axis not calculated, current location is shell (1)
+    toShell = np.zeros(brickFreqMatrix.shape, dtype=bool)
+    for axis, axisName in enumerate("xyz"):
+        if axisName not in (axes or ""):
+            toShell |= shiftMatrix(outside, axis, 1, fill=True) | shiftMatrix(outside, axis, -1, fill=True)
+    toShell &= brickFreqMatrix == bfmInside
+    # If shell location (1) does not intersect outside location (0), make it inside (-1) (skips boundary locs)
+    outsideNeighbor = np.zeros(brickFreqMatrix.shape, dtype=bool)
+    for axis in range(3):
+        outsideNeighbor |= shiftMatrix(outside, axis, 1) | shiftMatrix(outside, axis, -1)
+    toInside = (brickFreqMatrix == bfmShell) & ~outsideNeighbor
+    toInside[[0, -1], :, :] = False
+    toInside[:, [0, -1], :] = False
+    toInside[:, :, [0, -1]] = False
+    brickFreqMatrix[toShell] = bfmShell
+    brickFreqMatrix[toInside] = bfmInside
 
     # mark outside brickFreqMatrix values not adjacent to an inside value for removal
-    for x in range(xL):
-        for y in range(yL):
-            for z in range(zL):
-                if (brickFreqMatrix[x][y][z] == 0 and
-                    (x == xL - 1 or brickFreqMatrix[x+1][y][z] in [0, None]) and
-                    (x == 0 or      brickFreqMatrix[x-1][y][z] in [0, None]) and
-                    (y == yL - 1 or brickFreqMatrix[x][y+1][z] in [0, None]) and
-                    (y == 0 or      brickFreqMatrix[x][y-1][z] in [0, None]) and
-                    (z == zL - 1 or brickFreqMatrix[x][y][z+1] in [0, None]) and
-                    (z == 0 or      brickFreqMatrix[x][y][z-1] in [0, None])):
-                    brickFreqMatrix[x][y][z] = None
+    notOutsideNeighbor = np.zeros(brickFreqMatrix.shape, dtype=bool)
+    for axis in range(3):
+        notOutsideNeighbor |= shiftMatrix(~outside, axis, 1) | shiftMatrix(~outside, axis, -1)
+    brickFreqMatrix[outside & ~notOutsideNeighbor] = bfmRemoved
 
 
 def updateInternals(brickFreqMatrix, cm=None, faceIdxMatrix=None):
     """ set up brickFreqMatrix values for bricks inside shell (-1) """
-    j = 1
-    # NOTE: Following two lines calculate partial brickFreqMatrix (insideness only calculated as deep as necessary)
-    # denom = min([(cm.shellThickness-1), max(len(brickFreqMatrix)-2, len(brickFreqMatrix[0])-2, len(brickFreqMatrix[0][0])-2)])/2
-    # for idx in range(cm.shellThickness-1):
-    # NOTE: Following two lines calculate full brickFreqMatrix
-    denom = max(len(brickFreqMatrix)-2, len(brickFreqMatrix[0])-2, len(brickFreqMatrix[0][0])-2)/2
-    old_percent = 0
+    shape = np.array(brickFreqMatrix.shape)
+    # offsets to adjacent locations (in order checked for nearest face)
+    offsets = np.array(((1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1)))
     old_percent = updateProgressBars(True, False, 0, -1, "Internal")
-    for i in range(50):
-        j0 = j
-        j = round(j-0.01, 2)
-        gotOne = False
-        for x in range(len(brickFreqMatrix)):
-            # print status to terminal
-            old_percent = updateProgressBars(True, False, ((i + x / len(brickFreqMatrix)) ** 0.6) / 7.07107, old_percent, "Internal")
-            for y in range(len(brickFreqMatrix[0])):
-                for z in range(len(brickFreqMatrix[0][0])):
-                    if brickFreqMatrix[x][y][z] != -1:
-                        continue
-                    idxsToCheck = [(x+1, y, z),
-                                   (x-1, y, z),
-                                   (x, y+1, z),
-                                   (x, y-1, z),
-                                   (x, y, z+1),
-                                   (x, y, z-1)]
-                    for idx in idxsToCheck:
-                        try:
-                            curVal = brickFreqMatrix[idx[0]][idx[1]][idx[2]]
-                        except IndexError:
-                            continue
-                        if curVal == j0:
-                            brickFreqMatrix[x][y][z] = j
-                            if faceIdxMatrix: faceIdxMatrix[x][y][z] = faceIdxMatrix[idx[0]][idx[1]][idx[2]]
-                            gotOne = True
-                            break
-        if not gotOne:
+    # expand inward from shell one layer at a time (each layer is 0.01 less than the last, down to 0.5)
+    frontier = np.transpose(np.nonzero(brickFreqMatrix == bfmShell))
+    # narrow band only needs layers within shell thickness (plus one layer to check exposure against)
+    numLayers = min(cm.shellThickness, 50) if cm is not None and getNarrowBand(cm) else 50
+    for i in range(numLayers):
+        j = bfmShell - (i + 1)
+        # print status to terminal
+        old_percent = updateProgressBars(True, False, i / numLayers, old_percent, "Internal")
+        # get inside locations adjacent to current layer
+        locsL, srcsL, dirsL = [], [], []
+        for d, offset in enumerate(offsets):
+            locs = frontier - offset
+            inBounds = np.all((locs >= 0) & (locs < shape), axis=1)
+            locs, srcs = locs[inBounds], frontier[inBounds]
+            inside = brickFreqMatrix[tuple(locs.T)] == bfmInside
+            locsL.append(locs[inside])
+            srcsL.append(srcs[inside])
+            dirsL.append(np.full(np.count_nonzero(inside), d))
+        locs = np.concatenate(locsL)
+        if len(locs) == 0:
             break
+        srcs = np.concatenate(srcsL)
+        # keep first adjacent location (in order of 'offsets') in current layer for each new location
+        keys = np.ravel_multi_index(tuple(locs.T), tuple(shape))
+        order = np.lexsort((np.concatenate(dirsL), keys))
+        keys, locs, srcs = keys[order], locs[order], srcs[order]
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        locs, srcs = locs[first], srcs[first]
+        brickFreqMatrix[tuple(locs.T)] = j
+        if faceIdxMatrix:
+            for (x, y, z), (x0, y0, z0) in zip(locs.tolist(), srcs.tolist()):
+                faceIdxMatrix[x][y][z] = faceIdxMatrix[x0][y0][z0]
+        frontier = locs
     # end progress bar
     updateProgressBars(True, False, 1, 0, "Internal", end=True)
 
 
+def getNarrowBand(cm):
+    """ returns True if only lattice locations near the source surface should be stored """
+    return cm.useNarrowBand and cm.internalSupports == "NONE"
+
 def getThreshold(cm):
     """ returns threshold (draw bricks if returned val >= threshold) """
     return 1.01 - (cm.shellThickness / 100)
@@ -582,27 +684,64 @@ def createBricksDictEntry(name:str, val:float=0, draw:bool=False, co:tuple=(0, 0
     created_from      -- key of brick this brick was created from in drawAdjacent
 
     """
-    return {"name":name,
-            "val":val,
-            "draw":draw,
-            "co":co,
-            "near_face":near_face,
-            "near_intersection":near_intersection,
-            "near_normal":near_normal,
-            "rgba":rgba,
-            "mat_name":mat_name,
-            "custom_mat_name":custom_mat_name,
-            "parent":parent,
-            "size":size,
-            "attempted_merge":attempted_merge,
-            "top_exposed":top_exposed,
-            "bot_exposed":bot_exposed,
-            "obscures":obscures,
-            "type":bType,
-            "flipped":flipped,
-            "rotated":rotated,
-            "created_from":created_from,
-           }
+    return BrickEntry(name=name,
+                      val=val,
+                      draw=draw,
+                      co=co,
+                      near_face=near_face,
+                      near_intersection=near_intersection,
+                      near_normal=near_normal,
+                      rgba=rgba,
+                      mat_name=mat_name,
+                      custom_mat_name=custom_mat_name,
+                      parent=parent,
+                      size=size,
+                      attempted_merge=attempted_merge,
+                      top_exposed=top_exposed,
+                      bot_exposed=bot_exposed,
+                      obscures=obscures,
+                      type=bType,
+                      flipped=flipped,
+                      rotated=rotated,
+                      created_from=created_from)
+
+def getVoxelizationKey(cm, source, coordMatrix, calculationAxes):
+    """ content-addressed key for brickFreqMatrix and faceIdxMatrix of 'source' computed over 'coordMatrix' """
+    # verifyExposure is read by the ray cast engine but isn't part of the matrix settings
+    verifyExposure = cm.verifyExposure if cm.brickMatrixEngine != "SCANLINE" else None
+    # source geometry is hashed relative to the lattice, so translated copies of a mesh share their voxelization
+    return (hash_object_relative(source, coordMatrix.origin), getMatrixSettings(cm), verifyExposure, calculationAxes, coordMatrix.step.to_tuple(), coordMatrix.shape)
+
+
+def packVoxelization(brickFreqMatrix, faceIdxMatrix, origin):
+    """ compact read-only arrays of brickFreqMatrix and the faceIdxMatrix data bricksDict entries are made from
+
+    returns (brickFreqMatrix, lattice origin, locations with nearest face data, face indices, face intersections, face normals)
+    """
+    cells = [cell for cell in np.argwhere(brickFreqMatrix != bfmRemoved).tolist() if type(faceIdxMatrix[cell[0]][cell[1]][cell[2]]) == dict]
+    faces = [faceIdxMatrix[x][y][z] for x, y, z in cells]
+    voxelization = (brickFreqMatrix,
+                    np.array(origin, dtype=np.float64),
+                    np.array(cells, dtype=np.int32).reshape(-1, 3),
+                    np.array([f["idx"] for f in faces], dtype=np.int32),
+                    np.array([f["loc"].to_tuple() for f in faces], dtype=np.float64).reshape(-1, 3),
+                    np.array([f["normal"].to_tuple() for f in faces], dtype=np.float64).reshape(-1, 3))
+    for arr in voxelization:
+        arr.setflags(write=False)
+    return voxelization
+
+
+def getNearFaces(voxelization, origin):
+    """ {(x, y, z): (face index, face intersection, face normal)} from voxelization packed with 'packVoxelization'
+
+    face intersections are moved from the lattice origin the voxelization was computed at to 'origin'
+    """
+    _, cachedOrigin, cells, faceIdxs, locs, normals = voxelization
+    shift = np.array(origin, dtype=np.float64) - cachedOrigin
+    if shift.any():
+        locs = locs + shift
+    return {tuple(cell): (idx, tuple(loc), Vector(normal)) for cell, idx, loc, normal in zip(cells.tolist(), faceIdxs.tolist(), locs.tolist(), normals.tolist())}
+
 
 @timed_call('Time Elapsed')
 def makeBricksDict(source, source_details, brickScale, origSource, cursorStatus=False):
@@ -621,16 +760,25 @@ def makeBricksDict(source, source_details, brickScale, origSource, cursorStatus=
         offset = offset - source.parent.location
     # get coordinate list from intersections of edges with faces
     coordMatrix = generateLattice(brickScale, lScale, offset)
-    if len(coordMatrix) == 0:
-        coordMatrix.append(source_details.mid)
     # set calculationAxes
     calculationAxes = cm.calculationAxes if cm.brickShell != "INSIDE" else "XYZ"
     # set up faceIdxMatrix and brickFreqMatrix
-    faceIdxMatrix = np.zeros((len(coordMatrix), len(coordMatrix[0]), len(coordMatrix[0][0]))).tolist()
+    faceIdxMatrix = np.zeros(coordMatrix.shape).tolist()
     if cm.isSmoke:
         brickFreqMatrix, smokeColors = getBrickMatrixSmoke(origSource, faceIdxMatrix, cm.brickShell, source_details, cursorStatus=cursorStatus)
+        nearFaces = {}
     else:
-        brickFreqMatrix = getBrickMatrix(source, faceIdxMatrix, coordMatrix, cm.brickShell, axes=calculationAxes, cursorStatus=cursorStatus)
+        # reuse voxelization of models with identical source geometry (relative to the lattice) and matrix settings
+        voxelKey = getVoxelizationKey(cm, source, coordMatrix, calculationAxes)
+        voxelization = bricker_voxel_cache.get(voxelKey)
+        if voxelization is None:
+            getBrickMatrixFn = getBrickMatrixScanline if cm.brickMatrixEngine == "SCANLINE" else getBrickMatrix
+            brickFreqMatrix = getBrickMatrixFn(source, faceIdxMatrix, coordMatrix, cm.brickShell, axes=calculationAxes, cursorStatus=cursorStatus)
+            voxelization = packVoxelization(brickFreqMatrix, faceIdxMatrix, coordMatrix.origin)
+            bricker_voxel_cache.setMaxBytes(getAddonPrefs().voxel_cache_size * 1024 * 1024)
+            bricker_voxel_cache[voxelKey] = voxelization
+        brickFreqMatrix = voxelization[0]
+        nearFaces = getNearFaces(voxelization, coordMatrix.origin)
         smokeColors = None
 
     # initialize active keys
@@ -638,49 +786,47 @@ def makeBricksDict(source, source_details, brickScale, origSource, cursorStatus=
 
     # create bricks dictionary with brickFreqMatrix values
     i = 0
-    bricksDict = {}
+    bricksDict = BricksDict()
     threshold = getThreshold(cm)
     brickType = cm.brickType  # prevents cm.brickType update function from running over and over in for loop
     noOffset = vec_round(offset, precision=5) == Vector((0, 0, 0))
     # get uv_texture image and pixels for material calculation
     uv_images = getUVImages(source)
-    for x in range(len(coordMatrix)):
-        for y in range(len(coordMatrix[0])):
-            for z in range(len(coordMatrix[0][0])):
-                # skip brickFreqMatrix values set to None
-                if brickFreqMatrix[x][y][z] is None:
-                    continue
-
-                # initialize variables
-                bKey = "{x},{y},{z}".format(x=x, y=y, z=z)
-                co = coordMatrix[x][y][z].to_tuple() if noOffset else (Vector(coordMatrix[x][y][z]) - source_details.mid).to_tuple()
-                i += 1
-
-                # get material from nearest face intersection point
-                nf = faceIdxMatrix[x][y][z]["idx"] if type(faceIdxMatrix[x][y][z]) == dict else None
-                ni = faceIdxMatrix[x][y][z]["loc"].to_tuple() if type(faceIdxMatrix[x][y][z]) == dict else None
-                nn = faceIdxMatrix[x][y][z]["normal"] if type(faceIdxMatrix[x][y][z]) == dict else None
-                norm_dir = getNormalDirection(nn)
-                bType = "PLATE" if brickType == "BRICKS AND PLATES" else (brickType[:-1] if brickType.endswith("S") else ("CUSTOM 1" if brickType == "CUSTOM" else brickType))
-                flipped, rotated = getFlipRot("" if norm_dir is None else norm_dir[1:])
-                rgba = smokeColors[x][y][z] if smokeColors else getUVPixelColor(scn, cm, source, nf, ni, uv_images)
-                draw = brickFreqMatrix[x][y][z] >= threshold
-                # create bricksDict entry for current brick
-                bricksDict[bKey] = createBricksDictEntry(
-                    name= 'Bricker_%(n)s_brick__%(bKey)s' % locals(),
-                    val= brickFreqMatrix[x][y][z],
-                    draw= draw,
-                    co= co,
-                    near_face= nf,
-                    near_intersection= ni,
-                    near_normal= norm_dir,
-                    rgba= rgba,
-                    # mat_name= "",  # defined in 'updateMaterials' function
-                    # obscures= [brickFreqMatrix[x][y][z] != 0]*6,
-                    bType= bType,
-                    flipped= flipped,
-                    rotated= rotated,
-                )
+    # skip brickFreqMatrix values set to None (and internal values beyond narrow band)
+    keep = brickFreqMatrix != bfmRemoved
+    if getNarrowBand(cm):
+        keep &= brickFreqMatrix != bfmInside
+    for x, y, z in zip(*(idxs.tolist() for idxs in np.nonzero(keep))):
+        val = getBFMVal(brickFreqMatrix[x, y, z])
+
+        # initialize variables
+        bKey = "{x},{y},{z}".format(x=x, y=y, z=z)
+        co = coordMatrix.coord(x, y, z).to_tuple() if noOffset else (coordMatrix.coord(x, y, z) - source_details.mid).to_tuple()
+        i += 1
+
+        # get material from nearest face intersection point
+        nf, ni, nn = nearFaces.get((x, y, z), (None, None, None))
+        norm_dir = getNormalDirection(nn)
+        bType = "PLATE" if brickType == "BRICKS AND PLATES" else (brickType[:-1] if brickType.endswith("S") else ("CUSTOM 1" if brickType == "CUSTOM" else brickType))
+        flipped, rotated = getFlipRot("" if norm_dir is None else norm_dir[1:])
+        rgba = smokeColors[x][y][z] if smokeColors else getUVPixelColor(scn, cm, source, nf, ni, uv_images)
+        draw = val >= threshold
+        # create bricksDict entry for current brick
+        bricksDict[bKey] = createBricksDictEntry(
+            name= 'Bricker_%(n)s_brick__%(bKey)s' % locals(),
+            val= val,
+            draw= draw,
+            co= co,
+            near_face= nf,
+            near_intersection= ni,
+            near_normal= norm_dir,
+            rgba= rgba,
+            # mat_name= "",  # defined in 'updateMaterials' function
+            # obscures= [brickFreqMatrix[x, y, z] != 0]*6,
+            bType= bType,
+            flipped= flipped,
+            rotated= rotated,
+        )
     cm.numBricksGenerated = i
 
     # return list of created Brick objects
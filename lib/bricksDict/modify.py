@@ -74,21 +74,68 @@ def updateMaterials(bricksDict, source, origSource, curFrame=None):
     return bricksDict
 
 
-def updateBrickSizes(cm, bricksDict, key, availableKeys, loc, brickSizes, zStep, maxL, height3Only=False, mergeVertical=False, tallType="BRICK", shortType="PLATE"):
-    """ update 'brickSizes' with available brick sizes surrounding bricksDict[key] """
+def getAvailabilityRuns(cm, bricksDict, key, loc, availableKeys, maxLs, zStep, mergeVertical=False):
+    """ run lengths of bricks available to merge with bricksDict[key] (from loc towards +X, +Y and +Z)
+
+    Keyword Arguments:
+    maxLs -- list of [maxX, maxY, maxZ] limits (only bricks in the union of these boxes are checked)
+
+    returns (yRuns, zRuns) where yRuns[i] is the number of consecutive available bricks in the +Y direction
+    starting at x offset i (stops after the first 0), and zRuns[i][j] is the number of consecutive available
+    z offsets at (i, j) (only checked past the first when merging vertically)
+    """
+    sourceBrick = bricksDict[key]
+    x0, y0, z0 = loc
+    checkZ = mergeVertical and zStep == 1
+
+    def isAvail(x, y, z):
+        k = "{x},{y},{z}".format(x=x, y=y, z=z)
+        return k in availableKeys and brickAvail(cm, sourceBrick, bricksDict.get(k))
+
+    yRuns = []
+    zRuns = []
+    # bricks beyond the shortest run so far can't be part of any rectangle
+    maxRun = max(maxL[1] for maxL in maxLs)
+    maxZ = max(maxL[2] for maxL in maxLs)
+    for i in range(max(maxL[0] for maxL in maxLs)):
+        # only check as far in +Y as the widest box reaching this x offset
+        maxRun = min(maxRun, max(maxL[1] for maxL in maxLs if i < maxL[0]))
+        yRun = 0
+        while yRun < maxRun and isAvail(x0 + i, y0 + yRun, z0):
+            yRun += 1
+        yRuns.append(yRun)
+        if yRun == 0:
+            break
+        maxRun = yRun
+        curZRuns = []
+        for j in range(yRun):
+            zRun = 1
+            while checkZ and zRun < maxZ and isAvail(x0 + i, y0 + j, z0 + zRun):
+                zRun += 1
+            curZRuns.append(zRun)
+        zRuns.append(curZRuns)
+    return yRuns, zRuns
+
+
+def updateBrickSizes(cm, bricksDict, key, availableKeys, loc, brickSizes, zStep, maxL, height3Only=False, mergeVertical=False, tallType="BRICK", shortType="PLATE", runs=None):
+    """ update 'brickSizes' with available brick sizes surrounding bricksDict[key]
+
+    Keyword Arguments:
+    runs -- (yRuns, zRuns) from getAvailabilityRuns covering maxL (calculated if None)
+    """
+    yRuns, zRuns = runs or getAvailabilityRuns(cm, bricksDict, key, loc, availableKeys, [maxL], zStep, mergeVertical)
     newMax1 = maxL[1]
     newMax2 = maxL[2]
-    breakOuter1 = False
-    breakOuter2 = False
-    for i in range(maxL[0]):
+    for i in range(min(maxL[0], len(yRuns))):
+        # break case 2
+        if yRuns[i] == 0:
+            break
         for j in range(maxL[1]):
             # break case 1
             if j >= newMax1: break
             # break case 2
-            key1 = listToStr([loc[0] + i, loc[1] + j, loc[2]])
-            if not brickAvail(cm, bricksDict[key], bricksDict.get(key1)) or key1 not in availableKeys:
-                if j == 0: breakOuter2 = True
-                else:      newMax1 = j
+            if j >= yRuns[i]:
+                newMax1 = j
                 break
             # else, check vertically
             for k in range(0, maxL[2], zStep):
@@ -97,10 +144,8 @@ def updateBrickSizes(cm, bricksDict, key, availableKeys, loc, brickSizes, zStep,
                 # break case 1
                 elif k >= newMax2: break
                 # break case 2
-                key2 = listToStr([loc[0] + i, loc[1] + j, loc[2] + k])
-                if not brickAvail(cm, bricksDict[key], bricksDict.get(key2)) or key2 not in availableKeys:
-                    if k == 0: breakOuter1 = True
-                    else:      newMax2 = k
+                elif k >= zRuns[i][j]:
+                    newMax2 = k
                     break
                 # bricks with 2/3 height can't exist
                 elif k == 1: continue
@@ -111,30 +156,45 @@ def updateBrickSizes(cm, bricksDict, key, availableKeys, loc, brickSizes, zStep,
                         continue
                     if not (newSize[2] == 1 and height3Only) and (not cm.legalBricksOnly or legalBrickSize(s=newSize, t=tallType if newSize[2] == 3 else shortType)):
                         brickSizes.append(newSize)
-            if breakOuter1: break
-        breakOuter1 = False
-        if breakOuter2: break
+
+
+def getBrickSizes(cm, bricksDict, key, loc, availableKeys, defaultSize, zStep, mergeVertical=True, height3Only=False, tallType="BRICK", shortType="PLATE"):
+    """ get sizes bricksDict[key] can be merged to with adjacent bricks in 'availableKeys' (starting with defaultSize) """
+    brickSizes = [defaultSize]
+    if cm.brickType != "CUSTOM":
+        mergeVertical = mergeVertical and "PLATES" in cm.brickType
+        maxLs = [[cm.maxWidth, cm.maxDepth][::i] for i in ([1, -1] if cm.maxWidth != cm.maxDepth else [1])]
+        # find available bricks once for both width-depth and depth-width
+        runs = getAvailabilityRuns(cm, bricksDict, key, loc, availableKeys, [maxL + [3] for maxL in maxLs], zStep, mergeVertical)
+        # check width-depth and depth-width
+        for maxL in maxLs:
+            # iterate through adjacent locs to find available brick sizes
+            updateBrickSizes(cm, bricksDict, key, availableKeys, loc, brickSizes, zStep, maxL + [3], height3Only, mergeVertical, tallType=tallType, shortType=shortType, runs=runs)
+    return brickSizes
 
 
 def attemptMerge(cm, bricksDict, key, availableKeys, defaultSize, zStep, randState, preferLargest=False, mergeVertical=True, targetType=None, height3Only=False):
     """ attempt to merge bricksDict[key] with adjacent bricks """
     # get loc from key
-    loc = strToList(key)
-    brickSizes = [defaultSize]
+    loc = getDictLoc(key, bricksDict)
     tallType = getTallType(cm, bricksDict[key], targetType)
     shortType = getShortType(cm, bricksDict[key], targetType)
+    brickSizes = getBrickSizes(cm, bricksDict, key, loc, availableKeys, defaultSize, zStep, mergeVertical, height3Only, tallType, shortType)
 
     if cm.brickType != "CUSTOM":
-        # check width-depth and depth-width
-        for i in [1, -1] if cm.maxWidth != cm.maxDepth else [1]:
-            # iterate through adjacent locs to find available brick sizes
-            updateBrickSizes(cm, bricksDict, key, availableKeys, loc, brickSizes, zStep, [cm.maxWidth, cm.maxDepth][::i] + [3], height3Only, mergeVertical and "PLATES" in cm.brickType, tallType=tallType, shortType=shortType)
         # sort brick types from smallest to largest
         order = randState.randint(0,2)
         brickSizes.sort(key=lambda x: (x[0] * x[1] * x[2]) if preferLargest else (x[2], x[order], x[(order+1)%2]))
 
     # grab the biggest brick size and store to bricksDict
     brickSize = brickSizes[-1]
+    setBrickSize(cm, bricksDict, key, loc, brickSize, zStep, tallType, shortType)
+
+    return brickSize
+
+
+def setBrickSize(cm, bricksDict, key, loc, brickSize, zStep, tallType="BRICK", shortType="PLATE"):
+    """ merge bricks in 'brickSize' starting at bricksDict[key] into a single brick """
     bricksDict[key]["size"] = brickSize
 
     # set attributes for merged brick keys
@@ -154,8 +214,6 @@ def attemptMerge(cm, bricksDict, key, availableKeys, defaultSize, zStep, randSta
     if bricksDict[key]["type"] == "SLOPE" and cm.brickType == "SLOPES":
         setBrickTypeForSlope(bricksDict, key, keysInBrick)
 
-    return brickSize
-
 
 def getBrickExposure(cm, bricksDict, key=None, loc=None):
     """ return top and bottom exposure of brick at 'key' """
@@ -180,7 +238,7 @@ def getBrickExposure(cm, bricksDict, key=None, loc=None):
     # Iterate through brick locs in size to check top and bottom exposure
     keysInBrick = getKeysInBrick(cm, size, key, loc, zStep)
     for k in keysInBrick:
-        x, y, _ = strToList(k)
+        x, y, _ = getDictLoc(k, bricksDict)
         # don't check keys where keys above are in current brick
         if bricksDict[k]["val"] != 1 and not (flatBrickType(cm) and size[2] == 3):
             continue
@@ -0,0 +1,129 @@
+"""
+Copyright (C) 2017 Bricks Brought to Life
+http://bblanimation.com/
+chris@bblanimation.com
+
+Created by Christopher Gearhart
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# System imports
+import time
+
+# Blender imports
+# NONE!
+
+# Addon imports
+from .functions import *
+from .modify import *
+from ...functions import *
+
+# number of partial tilings kept per step of the layer search
+mergeBeamWidth = 8
+
+
+class CoveredKeys:
+    """ availableKeys of a partial tiling (keys in 'availableKeys' not yet covered by a brick) """
+    __slots__ = ("availableKeys", "covered")
+
+    def __init__(self, availableKeys, covered):
+        self.availableKeys = availableKeys
+        self.covered = covered
+
+    def __contains__(self, key):
+        return key in self.availableKeys and key not in self.covered
+
+
+def optimizeLayerMerge(cm, bricksDict, keys, availableKeys, zStep, mergeVertical=True, alignDict=None, timeLimit=1.0):
+    """ merge bricks starting at 'keys' (one z level) with a beam search for few, well staggered bricks
+
+    Keyword Arguments:
+    availableKeys -- set of keys bricks may be merged with (updated in place)
+    alignDict     -- bricksDict to count aligned edges with bricks below in (defaults to bricksDict)
+    timeLimit     -- seconds to search before finishing the layer with the best partial tiling only
+
+    Bricks are scored like connectivity variations in makeBricks (aligned edges with the
+    layer below plus two per brick, lower is better), so the search favors large bricks that
+    stagger with the bricks below them. Each brick's score is spread over its keys on this
+    layer and charged as the scan passes them, so partial tilings are compared fairly.
+    returns list of (brick size string, brick type) for merged bricks (as mergeLayer)
+    """
+    alignDict = alignDict or bricksDict
+    startTime = time.time()
+    # get keys to be merged in scan order (a brick's first key in this order is always its parent key)
+    freeKeys = []
+    for key in keys:
+        brickD = bricksDict[key]
+        if brickD["attempted_merge"] or brickD["parent"] not in [None, "self"]:
+            availableKeys.discard(key)
+            continue
+        freeKeys.append(key)
+    freeKeys.sort(key=lambda k: getDictLoc(k, bricksDict)[1::-1])
+
+    # each partial tiling is (score, placed bricks as (prev, key, size) linked list, {covered key: ((y, x), score)})
+    beam = [(0, None, {})]
+    for key in freeKeys:
+        brickD = bricksDict[key]
+        loc = getDictLoc(key, bricksDict)
+        pos = (loc[1], loc[0])
+        keepSize = brickD["size"] is not None and not cm.buildIsDirty
+        tallType = getTallType(cm, brickD)
+        shortType = getShortType(cm, brickD)
+        height3Only = brickD["type"] in getBrickTypes(height=3)
+        # get candidate next tilings
+        candidates = []
+        for state in beam:
+            score, _, covered = state
+            if key in covered:
+                candidates.append((score + covered[key][1], 0, state, None))
+                continue
+            if keepSize:
+                brickSizes = [brickD["size"]]
+            else:
+                brickSizes = getBrickSizes(cm, bricksDict, key, loc, CoveredKeys(availableKeys, covered), [1, 1, zStep], zStep, mergeVertical, height3Only, tallType, shortType)
+            for size in brickSizes:
+                cost = (getNumAlignedEdges(cm, alignDict, size, key, loc, zStep) + 2) / (size[0] * size[1])
+                candidates.append((score + cost, -size[0] * size[1] * size[2], state, size))
+        # keep best tilings (only the best one once out of time)
+        candidates.sort(key=lambda c: c[:2])
+        beamWidth = mergeBeamWidth if time.time() - startTime < timeLimit else 1
+        beam = []
+        for score, _, (scoreBefore, placed, covered), size in candidates[:beamWidth]:
+            if size is not None:
+                # forget covered keys the scan has passed
+                covered = {k: v for k, v in covered.items() if v[0] > pos}
+                cost = score - scoreBefore
+                for k in getKeysInBrick(cm, size, key, loc, zStep):
+                    x, y, _ = getDictLoc(k, bricksDict)
+                    covered[k] = ((y, x), cost)
+                placed = (placed, key, size)
+            beam.append((score, placed, covered))
+
+    # unwind best tiling
+    placed = beam[0][1]
+    bricks = []
+    while placed is not None:
+        placed, key, size = placed
+        bricks.append((key, size))
+    # store best tiling to bricksDict
+    sizesUsed = []
+    for key, size in reversed(bricks):
+        brickD = bricksDict[key]
+        loc = getDictLoc(key, bricksDict)
+        if brickD["size"] is None or cm.buildIsDirty:
+            setBrickSize(cm, bricksDict, key, loc, size, zStep, getTallType(cm, brickD), getShortType(cm, brickD))
+        availableKeys.difference_update(getKeysInBrick(cm, size, key, loc, zStep))
+        sizesUsed.append((listToStr(sorted(size[:2]) + [size[2]]), brickD["type"]))
+    return sizesUsed
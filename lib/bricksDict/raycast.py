@@ -0,0 +1,70 @@
+"""
+Copyright (C) 2017 Bricks Brought to Life
+http://bblanimation.com/
+chris@bblanimation.com
+
+Created by Christopher Gearhart
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# System imports
+# NONE!
+
+# Blender imports
+import bpy
+from mathutils import Vector
+from mathutils.bvhtree import BVHTree
+
+# Addon imports
+from ..caches import bricker_bvh_cache
+from ...functions.hashObject import hash_object
+
+
+def getBVHTree(obj, scn=None):
+    """ returns BVH tree of evaluated mesh of 'obj' (built once and reused until 'obj' changes) """
+    scn = scn or bpy.context.scene
+    objHash = hash_object(obj)
+    cached = bricker_bvh_cache.get(obj.name)
+    if cached is not None and cached[0] == objHash:
+        return cached[1]
+    bvh = BVHTree.FromObject(obj, scn)
+    bricker_bvh_cache[obj.name] = (objHash, bvh)
+    return bvh
+
+
+def getRayHits(bvh, origin:Vector, direction:Vector, miniDist:Vector):
+    """ returns list of all intersections of ray from 'origin' in 'direction' sorted by distance
+
+    bvh       -- BVH tree of object to test intersections for
+    origin    -- origin point for ray casting
+    direction -- cast ray in this direction
+    miniDist  -- Vector with miniscule amount to add after each intersection (skips intersections within this distance)
+
+    each intersection is a tuple: (location, normal, face index, distance from 'origin')
+    """
+    hits = []
+    orig = origin
+    while True:
+        location, normal, index, _ = bvh.ray_cast(orig, direction)
+        if index is None:
+            break
+        hits.append((location, normal, index, (location - origin).length))
+        orig = location + miniDist
+    return hits
+
+
+def castRayBatch(bvh, origins, directions, miniDists):
+    """ returns list of all intersections (see 'getRayHits') for each ray cast from 'origins' in 'directions' """
+    return [getRayHits(bvh, Vector(origin), Vector(direction), Vector(miniDist)) for origin, direction, miniDist in zip(origins, directions, miniDists)]
@@ -0,0 +1,158 @@
+"""
+Copyright (C) 2017 Bricks Brought to Life
+http://bblanimation.com/
+chris@bblanimation.com
+
+Created by Christopher Gearhart
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# System imports
+import json
+import zlib
+import base64
+
+# Blender imports
+# NONE!
+
+# Addon imports
+from .container import *
+
+# deep cache string layout:
+#   "BFMC<version>;" + json header + "\n" + base64 encoded sections
+# each section is one zlib compressed, column-major bricksDict (one per
+# animation frame), so single frames can be decoded without touching the rest
+cacheMagic = "BFMC"
+cacheVersion = 1
+compressLevel = 6
+
+
+def encodeBricksDict(bricksDict):
+    """ pack bricksDict into compressed column-major bytes """
+    entries = list(bricksDict.values())
+    columns = {"keys": list(bricksDict.keys())}
+    for f in entryFields:
+        columns[f] = [entry.get(f) for entry in entries]
+    data = json.dumps(columns, separators=(",", ":")).encode()
+    return zlib.compress(data, compressLevel)
+
+
+def decodeBricksDict(data):
+    """ unpack bytes created with 'encodeBricksDict' into BricksDict """
+    columns = json.loads(zlib.decompress(data).decode())
+    keys = columns.pop("keys")
+    values = [columns[f] for f in entryFields]
+    bricksDict = BricksDict()
+    for i, key in enumerate(keys):
+        entry = BrickEntry()
+        for f, column in zip(entryFields, values):
+            setattr(entry, f, column[i])
+        bricksDict[key] = entry
+    return bricksDict
+
+
+class LazyBricksDict():
+    """ light cache placeholder for a packed bricksDict section (decoded on first access) """
+    __slots__ = ("section", "crc")
+
+    def __init__(self, section, crc):
+        self.section = section
+        self.crc = crc
+
+    def load(self):
+        return decodeBricksDict(base64.b64decode(self.section))
+
+    def isValid(self):
+        """ cheap integrity check of packed data (without decoding it) """
+        return zlib.crc32(self.section.encode()) == self.crc
+
+    def toDict(self):
+        return self.load().toDict()
+
+
+def packBFMCache(cachedDict, oldCacheString="", dirtyFrames=None):
+    """ pack bricksDict (or dict of animated frame bricksDicts) into deep cache string
+
+    Keyword Arguments:
+    cachedDict     -- bricksDict, or dict of animated frame bricksDicts, to pack (may hold LazyBricksDicts)
+    oldCacheString -- previously packed deep cache string for 'cachedDict'
+    dirtyFrames    -- frames changed since 'oldCacheString' was packed (others are copied from it undecoded)
+    """
+    if cachedDict is None:
+        return ""
+    anim = type(cachedDict) is not LazyBricksDict and not isBricksDict(cachedDict)
+    frames = cachedDict if anim else {"": cachedDict}
+    oldHeader, oldBodyStart = readBFMCacheHeader(oldCacheString) if dirtyFrames is not None else (None, 0)
+    oldSections = oldHeader["sections"] if oldHeader and oldHeader["anim"] == anim else {}
+    sections = {}
+    body = []
+    offset = 0
+    for frame, bricksDict in frames.items():
+        if bricksDict is None:
+            continue
+        if type(bricksDict) is LazyBricksDict:
+            section, crc = bricksDict.section, bricksDict.crc
+        elif frame in oldSections and frame not in dirtyFrames:
+            start, end, crc = oldSections[frame]
+            section = oldCacheString[oldBodyStart + start:oldBodyStart + end]
+        else:
+            section = base64.b64encode(encodeBricksDict(bricksDict)).decode()
+            crc = zlib.crc32(section.encode())
+        sections[frame] = [offset, offset + len(section), crc]
+        body.append(section)
+        offset += len(section)
+    header = {"anim": anim, "sections": sections}
+    return "%s%d;%s\n%s" % (cacheMagic, cacheVersion, json.dumps(header, separators=(",", ":")), "".join(body))
+
+
+def readBFMCacheHeader(cacheString):
+    """ get header and body start index of deep cache string (None for legacy json caches) """
+    if not cacheString.startswith(cacheMagic):
+        return None, 0
+    versionEnd = cacheString.index(";")
+    if int(cacheString[len(cacheMagic):versionEnd]) > cacheVersion:
+        raise ValueError("Deep cache was written by a newer version of Bricker")
+    headerEnd = cacheString.index("\n", versionEnd)
+    return json.loads(cacheString[versionEnd + 1:headerEnd]), headerEnd + 1
+
+
+def unpackBFMCache(cacheString, frame=None, lazy=False):
+    """ unpack deep cache string
+
+    Keyword Arguments:
+    cacheString -- deep cache string created with 'packBFMCache' (or json string from earlier versions)
+    frame       -- only unpack this frame of animated caches
+    lazy        -- return LazyBricksDicts to be decoded on first access
+    """
+    if cacheString in [None, ""]:
+        return None
+    header, bodyStart = readBFMCacheHeader(cacheString)
+    # support caches saved as json by earlier versions
+    if header is None:
+        cachedDict = json.loads(cacheString)
+        if cachedDict is None:
+            return None
+        cachedDict = wrapBricksDicts(cachedDict)
+        return cachedDict if frame is None else cachedDict.get(str(frame))
+    sections = header["sections"]
+    def unpackSection(key):
+        start, end, crc = sections[key]
+        bricksDict = LazyBricksDict(cacheString[bodyStart + start:bodyStart + end], crc)
+        return bricksDict if lazy else bricksDict.load()
+    if not header["anim"]:
+        return unpackSection("") if "" in sections else None
+    if frame is not None:
+        return unpackSection(str(frame)) if str(frame) in sections else None
+    return {f: unpackSection(f) for f in sections}
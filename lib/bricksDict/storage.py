@@ -20,7 +20,7 @@ Created by Christopher Gearhart
 """
 
 # System imports
-import json
+# NONE!
 
 # Blender imports
 import bpy
@@ -29,23 +29,39 @@ import bpy
 from .generate import *
 from .modify import *
 from .functions import *
-from ..caches import bricker_bfm_cache
+from .container import *
+from .serialize import *
+from ..caches import bricker_bfm_cache, bricker_bfm_dirty
 from ...functions import *
 
-def getBricksDict(dType="MODEL", source=None, source_details=None, dimensions=None, brickScale=None, updateCursor=True, curFrame=None, cm=None, origSource=None, restrictContext=True):
-    """ retrieve bricksDict from cache if possible, else create a new one """
+def getBricksDict(dType="MODEL", source=None, source_details=None, dimensions=None, brickScale=None, updateCursor=True, curFrame=None, cm=None, origSource=None, restrictContext=True, readOnly=False):
+    """ retrieve bricksDict from cache if possible, else create a new one (pass readOnly=True if it won't be modified) """
     scn = bpy.context.scene
     cm = cm or scn.cmlist[scn.cmlist_index]
     loadedFromCache = False
     # if bricksDict can be pulled from cache
     if not matrixReallyIsDirty(cm) and not (cm.BFMCache in [None, ""] and bricker_bfm_cache.get(cm.id) is None) and not (cm.animIsDirty and "ANIM" in dType):
         # try getting bricksDict from light cache, then deep cache
-        bricksDict = bricker_bfm_cache.get(cm.id) or json.loads(cm.BFMCache)
-        loadedFromCache = True
-        # if animated, index into that dict
         if "ANIM" in dType:
+            # if animated, index into that dict (only decoding the current frame from deep cache)
             adjusted_frame_current = getAnimAdjustedFrame(cm, curFrame)
-            bricksDict = bricksDict[str(adjusted_frame_current)]
+            frameKey = str(adjusted_frame_current)
+            cachedDict = bricker_bfm_cache.get(cm.id)
+            # decode frames left packed by 'deepToLightCache' on first access
+            if cachedDict and type(cachedDict[frameKey]) is LazyBricksDict:
+                cachedDict[frameKey] = cachedDict[frameKey].load()
+            bricksDict = cachedDict[frameKey] if cachedDict else unpackBFMCache(cm.BFMCache, frame=adjusted_frame_current)
+            # light cache is returned by reference, so assume the caller modifies it
+            if cachedDict and not readOnly:
+                markBricksDictDirty(cm.id, adjusted_frame_current)
+        else:
+            cachedDict = bricker_bfm_cache.get(cm.id)
+            if type(cachedDict) is LazyBricksDict:
+                cachedDict = bricker_bfm_cache[cm.id] = cachedDict.load()
+            bricksDict = cachedDict or unpackBFMCache(cm.BFMCache)
+            if cachedDict and not readOnly:
+                markBricksDictDirty(cm.id)
+        loadedFromCache = True
     # if context restricted, return nothing
     elif restrictContext:
         return None, False
@@ -58,6 +74,10 @@ def getBricksDict(dType="MODEL", source=None, source_details=None, dimensions=No
         bricksDict = makeBricksDict(source, source_details, brickScale, origSource=origSource, cursorStatus=updateCursor)
     return bricksDict, loadedFromCache
 
+def markBricksDictDirty(cm_id, frame=None):
+    """ flag light cache of cm_id (or one of its animation frames) as changed since last pushed to deep cache """
+    bricker_bfm_dirty.add(cm_id if frame is None else (cm_id, str(frame)))
+
 def lightToDeepCache(bricker_bfm_cache):
     """ send bricksDict from blender cache to python cache for quick access """
     scn = bpy.context.scene
@@ -67,8 +87,15 @@ def lightToDeepCache(bricker_bfm_cache):
         cm = getItemByID(scn.cmlist, cm_id)
         if not cm:
             continue
-        # save last cache to cm.BFMCache
-        cm.BFMCache = json.dumps(bricker_bfm_cache[cm_id])
+        # skip caches that haven't changed since they were last pushed
+        dirtyFrames = set(item[1] for item in bricker_bfm_dirty if type(item) == tuple and item[0] == cm_id)
+        if cm_id in bricker_bfm_dirty or cm.BFMCache == "":
+            cm.BFMCache = packBFMCache(bricker_bfm_cache[cm_id])
+        elif dirtyFrames:
+            cm.BFMCache = packBFMCache(bricker_bfm_cache[cm_id], oldCacheString=cm.BFMCache, dirtyFrames=dirtyFrames)
+        else:
+            continue
+        bricker_bfm_dirty.difference_update([cm_id] + [(cm_id, f) for f in dirtyFrames])
         numPushedIDs += 1
     if numPushedIDs > 0:
         print("[Bricker] pushed {numKeys} {pluralized_dicts} from light cache to deep cache".format(numKeys=numPushedIDs, pluralized_dicts="dict" if numPushedIDs == 1 else "dicts"))
@@ -81,19 +108,36 @@ def deepToLightCache(bricker_bfm_cache):
         # make sure there is something to store to light cache
         if cm.BFMCache == "":
             continue
-        bricksDict = json.loads(cm.BFMCache)
+        bricksDict = unpackBFMCache(cm.BFMCache, lazy=True)
         bricker_bfm_cache[cm.id] = bricksDict
+        bricker_bfm_dirty.difference_update([item for item in bricker_bfm_dirty if cm.id in (item, item[0] if type(item) == tuple else None)])
         numPulledIDs += 1
     if numPulledIDs > 0:
         print("[Bricker] pulled {numKeys} {pluralized_dicts} from deep cache to light cache".format(numKeys=numPulledIDs, pluralized_dicts="dict" if numPulledIDs == 1 else "dicts"))
 
+def bricksDictIsCached(cm):
+    """ check bricksDict of cm can be retrieved from cache (verifies packed data without decoding it) """
+    if matrixReallyIsDirty(cm):
+        return False
+    cachedDict = bricker_bfm_cache.get(cm.id)
+    if cachedDict is None:
+        return cm.BFMCache not in [None, ""]
+    if type(cachedDict) is LazyBricksDict:
+        return cachedDict.isValid()
+    if isBricksDict(cachedDict):
+        return True
+    return all(bricksDict.isValid() for bricksDict in cachedDict.values() if type(bricksDict) is LazyBricksDict)
+
 def cacheBricksDict(action, cm, bricksDict, curFrame=None):
     """ store bricksDict in light python cache for future access """
     scn = bpy.context.scene
     if action in ["CREATE", "UPDATE_MODEL"]:
         bricker_bfm_cache[cm.id] = bricksDict
+        markBricksDictDirty(cm.id)
     elif action in ["ANIMATE", "UPDATE_ANIM"]:
         if (cm.id not in bricker_bfm_cache.keys() or
            type(bricker_bfm_cache[cm.id]) != dict):
             bricker_bfm_cache[cm.id] = {}
+            markBricksDictDirty(cm.id)
         bricker_bfm_cache[cm.id][str(curFrame)] = bricksDict
+        markBricksDictDirty(cm.id, curFrame)
@@ -0,0 +1,449 @@
+"""
+Copyright (C) 2017 Bricks Brought to Life
+http://bblanimation.com/
+chris@bblanimation.com
+
+Created by Christopher Gearhart
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# System imports
+import multiprocessing
+import numpy as np
+
+# Blender imports
+# NONE!
+
+# Addon imports
+# NONE!
+
+# axes perpendicular to each ray cast axis: (inner axis, slab axis); matches loop order of getBrickMatrix
+perpendicularAxes = {0:(1, 2), 1:(0, 2), 2:(1, 0)}
+
+# read-only triangle data held by each slab worker process
+workerTriData = None
+
+
+def getTriangleData(obj):
+    """ returns (triCoords, triFaces, faceNormals) numpy arrays for the mesh of 'obj' (in object space)
+
+    triCoords   -- (T, 3, 3) coordinates of the three verts of each triangle
+    triFaces    -- (T,) index of the polygon each triangle was created from
+    faceNormals -- (F, 3) normal of each polygon
+    """
+    me = obj.data
+    numVerts = len(me.vertices)
+    numLoops = len(me.loops)
+    numPolys = len(me.polygons)
+    # read mesh data into numpy buffers
+    verts = np.empty(numVerts * 3, dtype=np.float64)
+    me.vertices.foreach_get("co", verts)
+    verts.shape = (numVerts, 3)
+    loopVerts = np.empty(numLoops, dtype=np.int32)
+    me.loops.foreach_get("vertex_index", loopVerts)
+    loopStarts = np.empty(numPolys, dtype=np.int32)
+    me.polygons.foreach_get("loop_start", loopStarts)
+    loopTotals = np.empty(numPolys, dtype=np.int32)
+    me.polygons.foreach_get("loop_total", loopTotals)
+    faceNormals = np.empty(numPolys * 3, dtype=np.float64)
+    me.polygons.foreach_get("normal", faceNormals)
+    faceNormals.shape = (numPolys, 3)
+    return triangulatePolygons(verts, loopVerts, loopStarts, loopTotals) + (faceNormals,)
+
+
+def triangulatePolygons(verts, loopVerts, loopStarts, loopTotals):
+    """ fan-triangulate polygons; returns (triCoords, triFaces) """
+    numTris = np.maximum(loopTotals - 2, 0)
+    triFaces = np.repeat(np.arange(len(loopTotals), dtype=np.int32), numTris)
+    # index of each triangle within its polygon's fan
+    fanIdx = np.arange(len(triFaces), dtype=np.int32) - np.repeat(np.cumsum(numTris) - numTris, numTris)
+    base = loopStarts[triFaces]
+    tris = np.stack((loopVerts[base], loopVerts[base + fanIdx + 1], loopVerts[base + fanIdx + 2]), axis=1)
+    return verts[tris], triFaces
+
+
+def getLatticeInfo(lattice):
+    """ returns origin, step, and resolution of regular lattice 'lattice' as numpy arrays """
+    origin = np.array(lattice.origin, dtype=np.float64)
+    step = np.array(lattice.step, dtype=np.float64)
+    res = np.array(lattice.shape, dtype=np.int64)
+    return origin, step, res
+
+
+def getRowHits(triCoords, axis, origin, step, res, slab, miniDist=0.00015, maxPairs=2**21):
+    """ intersect every lattice row in 'slab' parallel to 'axis' with the triangles
+
+    returns (rows, hitT, hitTris) sorted by row, then by distance along the row
+    rows    -- row index (slabIdx * len(innerAxis) + innerIdx) of each hit
+    hitT    -- hit location along 'axis' in lattice units (0 is the first lattice coordinate)
+    hitTris -- index of the intersected triangle
+    """
+    u, v = perpendicularAxes[axis]
+    nu = res[u]
+    v0, v1 = slab
+    # perturb ray origins slightly off the lattice so rays don't pass exactly through shared edges and verts
+    offsetU = step[u] * 1.2207e-5
+    offsetV = step[v] * 2.4414e-5
+    # get range of lattice rows overlapped by each triangle's bounding box
+    tU = (triCoords[:, :, u] - origin[u] - offsetU) / step[u]
+    tV = (triCoords[:, :, v] - origin[v] - offsetV) / step[v]
+    uMin = np.maximum(np.ceil(tU.min(axis=1)), 0).astype(np.int64)
+    uMax = np.minimum(np.floor(tU.max(axis=1)), nu - 1).astype(np.int64)
+    vMin = np.maximum(np.ceil(tV.min(axis=1)), v0).astype(np.int64)
+    vMax = np.minimum(np.floor(tV.max(axis=1)), v1 - 1).astype(np.int64)
+    lenU = np.maximum(uMax - uMin + 1, 0)
+    lenV = np.maximum(vMax - vMin + 1, 0)
+    numPairs = lenU * lenV
+    candidates = np.nonzero(numPairs)[0]
+
+    rowsL, hitTL, hitTrisL = [], [], []
+    # iterate through triangles in chunks so candidate (triangle, row) pairs fit in memory
+    cumPairs = np.cumsum(numPairs[candidates])
+    numChunks = int(cumPairs[-1] // maxPairs) + 1 if len(cumPairs) > 0 else 0
+    chunkBounds = np.searchsorted(cumPairs, np.arange(1, numChunks) * maxPairs, side="right")
+    chunkBounds = np.unique(np.concatenate(([0], chunkBounds, [len(candidates)])))
+    for c0, c1 in zip(chunkBounds[:-1], chunkBounds[1:]):
+        tris = candidates[c0:c1]
+        counts = numPairs[tris]
+        pairTris = np.repeat(tris, counts)
+        # index of each pair within its triangle's bounding box
+        pairIdx = np.arange(len(pairTris), dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+        pairU = uMin[pairTris] + pairIdx % lenU[pairTris]
+        pairV = vMin[pairTris] + pairIdx // lenU[pairTris]
+        # get 2D barycentric coordinates of ray origins within projected triangles
+        pu = pairU - tU[pairTris, 0]
+        pv = pairV - tV[pairTris, 0]
+        e1u = tU[pairTris, 1] - tU[pairTris, 0]
+        e1v = tV[pairTris, 1] - tV[pairTris, 0]
+        e2u = tU[pairTris, 2] - tU[pairTris, 0]
+        e2v = tV[pairTris, 2] - tV[pairTris, 0]
+        det = e1u * e2v - e2u * e1v
+        valid = np.abs(det) > 1e-12
+        det[~valid] = 1
+        w1 = (pu * e2v - e2u * pv) / det
+        w2 = (e1u * pv - pu * e1v) / det
+        hit = valid & (w1 >= 0) & (w2 >= 0) & (w1 + w2 <= 1)
+        pairTris, w1, w2 = pairTris[hit], w1[hit], w2[hit]
+        # interpolate hit location along ray axis
+        a = triCoords[pairTris, :, axis]
+        hitLoc = a[:, 0] + w1 * (a[:, 1] - a[:, 0]) + w2 * (a[:, 2] - a[:, 0])
+        rowsL.append((pairV[hit] - v0) * nu + pairU[hit])
+        hitTL.append((hitLoc - origin[axis]) / step[axis])
+        hitTrisL.append(pairTris)
+
+    if len(rowsL) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0, dtype=np.int64)
+    rows = np.concatenate(rowsL)
+    hitT = np.concatenate(hitTL)
+    hitTris = np.concatenate(hitTrisL)
+    # sort hits by row, then by distance along the row
+    order = np.lexsort((hitT, rows))
+    rows, hitT, hitTris = rows[order], hitT[order], hitTris[order]
+    # skip hits within 'miniDist' of the last hit (ray cast continues 'miniDist' past each intersection)
+    if len(rows) > 1:
+        keep = np.ones(len(rows), dtype=bool)
+        keep[1:] = (rows[1:] != rows[:-1]) | ((hitT[1:] - hitT[:-1]) * abs(step[axis]) >= miniDist)
+        rows, hitT, hitTris = rows[keep], hitT[keep], hitTris[keep]
+    return rows, hitT, hitTris
+
+
+def castAxisRays(triData, axis, origin, step, res, slab=None, miniDist=0.00015):
+    """ cast rays along 'axis' through every lattice coordinate in 'slab' (range of indices along slab axis)
+
+    returns dictionary of arrays with shape of the slab in (x, y, z) order:
+    countAfter  -- number of intersections in +axis direction from each coordinate
+    countBefore -- number of intersections in -axis direction from each coordinate
+    nextDir     -- dot product of ray direction (+axis) and normal of first intersection in +axis direction (0 if none)
+    prevDir     -- dot product of ray direction (-axis) and normal of first intersection in -axis direction (0 if none)
+    firstT      -- distance (in lattice units) to first intersection between coordinate and next coordinate along +axis (nan if none)
+    firstFace   -- face index of first intersection between coordinate and next coordinate along +axis (-1 if none)
+    lastT       -- distance (in lattice units) from last intersection between coordinate and next coordinate to next coordinate (nan if none)
+    lastFace    -- face index of last intersection between coordinate and next coordinate along +axis (-1 if none)
+    """
+    triCoords, triFaces, faceNormals = triData
+    u, v = perpendicularAxes[axis]
+    slab = slab or (0, int(res[v]))
+    na, nu, nv = int(res[axis]), int(res[u]), slab[1] - slab[0]
+    numRows = nu * nv
+    rows, hitT, hitTris = getRowHits(triCoords, axis, origin, step, res, slab, miniDist=miniDist)
+    numHits = len(rows)
+    # bin hits by lattice coordinate they follow (bin 0 holds hits before first coordinate; edges include their end coordinate)
+    bins = np.clip(np.ceil(hitT - 0.00001), 0, na).astype(np.int64)
+    groups = rows * (na + 1) + bins
+    hist = np.bincount(groups, minlength=numRows * (na + 1)).reshape(numRows, na + 1)
+    # count intersections after (t > i) and before (t < i) each coordinate
+    countAfter = np.cumsum(hist[:, ::-1], axis=1)[:, ::-1][:, 1:]
+    countBefore = np.cumsum(hist, axis=1)[:, :-1]
+    # get first and last hit in each bin (hits are sorted by row and distance)
+    sentinel = numHits
+    groupFirst = np.full(numRows * (na + 1), sentinel, dtype=np.int64)
+    groupLast = np.full(numRows * (na + 1), -1, dtype=np.int64)
+    uniqueGroups, firstIdxs = np.unique(groups, return_index=True)
+    groupFirst[uniqueGroups] = firstIdxs
+    uniqueGroups, lastIdxs = np.unique(groups[::-1], return_index=True)
+    groupLast[uniqueGroups] = numHits - 1 - lastIdxs
+    groupFirst = groupFirst.reshape(numRows, na + 1)
+    groupLast = groupLast.reshape(numRows, na + 1)
+    # get nearest hit in each direction from each coordinate
+    nextHit = np.minimum.accumulate(groupFirst[:, :0:-1], axis=1)[:, ::-1]
+    prevHit = np.maximum.accumulate(groupLast[:, :-1], axis=1)
+    # get dot product of ray direction and normals of nearest hits
+    hitDirs = np.append(faceNormals[triFaces[hitTris], axis], 0) if numHits > 0 else np.zeros(1)
+    nextDir = hitDirs[nextHit]
+    prevDir = -hitDirs[prevHit] * (prevHit != -1)
+    # get first and last hits between each coordinate and the next
+    edgeFirst = groupFirst[:, 1:]
+    edgeLast = groupLast[:, 1:]
+    hasEdge = edgeLast != -1
+    hasEdge[:, -1] = False
+    hitTPad = np.append(hitT, np.nan)
+    hitFacesPad = np.append(triFaces[hitTris], -1)
+    coordIdxs = np.arange(na)
+    firstT = np.where(hasEdge, hitTPad[edgeFirst] - coordIdxs, np.nan)
+    lastT = np.where(hasEdge, coordIdxs + 1 - hitTPad[edgeLast], np.nan)
+    firstFace = np.where(hasEdge, hitFacesPad[edgeFirst], -1)
+    lastFace = np.where(hasEdge, hitFacesPad[edgeLast], -1)
+
+    # reshape (rows, axis) arrays to slab in (x, y, z) order
+    order = np.argsort([v, u, axis])
+    toXYZ = lambda arr: np.transpose(arr.reshape(nv, nu, na), order)
+    return {"countAfter":toXYZ(countAfter.astype(np.int32)),
+            "countBefore":toXYZ(countBefore.astype(np.int32)),
+            "nextDir":toXYZ(nextDir.astype(np.float32)),
+            "prevDir":toXYZ(prevDir.astype(np.float32)),
+            "firstT":toXYZ(firstT.astype(np.float32)),
+            "firstFace":toXYZ(firstFace.astype(np.int32)),
+            "lastT":toXYZ(lastT.astype(np.float32)),
+            "lastFace":toXYZ(lastFace.astype(np.int32))}
+
+
+def initSlabWorker(triData):
+    """ store triangle data for slab worker process """
+    global workerTriData
+    workerTriData = triData
+
+
+def castSlabRays(args):
+    """ cast rays for a single slab in slab worker process """
+    axis, origin, step, res, slab, miniDist = args
+    return castAxisRays(workerTriData, axis, origin, step, res, slab=slab, miniDist=miniDist)
+
+
+def getSlabs(length, numSlabs):
+    """ split range(length) into at most 'numSlabs' (start, stop) slabs of roughly equal size """
+    bounds = np.unique(np.linspace(0, length, numSlabs + 1).astype(np.int64))
+    return [(int(v0), int(v1)) for v0, v1 in zip(bounds[:-1], bounds[1:])]
+
+
+def castAxisRaysParallel(pool, numSlabs, axis, origin, step, res, miniDist=0.00015):
+    """ cast rays along 'axis' with slabs split between processes in 'pool' (same result as castAxisRays) """
+    slabAxis = perpendicularAxes[axis][1]
+    slabs = getSlabs(int(res[slabAxis]), numSlabs)
+    results = pool.map(castSlabRays, [(axis, origin, step, res, slab, miniDist) for slab in slabs])
+    # merge slab results in order along slab axis
+    return {key:np.concatenate([result[key] for result in results], axis=slabAxis) for key in results[0]}
+
+
+def getNumProcesses(numProcesses):
+    """ get number of processes to use for slab voxelization (0 for one per CPU core) """
+    if numProcesses == 0:
+        numProcesses = multiprocessing.cpu_count()
+    # worker processes must inherit triangle data without re-importing Blender
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return 1
+    return numProcesses
+
+
+def getOutsideMatrix(rayData, useNormals=False, castDoubleCheckRays=True):
+    """ returns boolean matrix of coordinates found to be outside source along ray cast axis """
+    outside = (rayData["countAfter"] % 2 == 0) & ~(useNormals & (rayData["nextDir"] > 0))
+    if castDoubleCheckRays:
+        # double check coordinates found to be inside with rays cast in opposite direction
+        outside |= (rayData["countBefore"] % 2 == 0) & ~(useNormals & (rayData["prevDir"] > 0))
+    return outside
+
+
+def buildWindingTree(triCoords, leafSize=8):
+    """ returns hierarchy of triangle clusters for approximating generalized winding numbers
+
+    each node is a dictionary with the following keys:
+    tris     -- indices of triangles in cluster
+    center   -- area-weighted centroid of cluster
+    radius   -- distance from 'center' to farthest triangle vert in cluster
+    areaVec  -- sum of area-weighted normals of triangles in cluster (dipole approximation)
+    children -- list of child nodes (None for leaf nodes)
+    """
+    centroids = triCoords.mean(axis=1)
+    areaVecs = np.cross(triCoords[:, 1] - triCoords[:, 0], triCoords[:, 2] - triCoords[:, 0]) / 2
+    areas = np.sqrt((areaVecs ** 2).sum(axis=1))
+
+    def buildNode(tris):
+        weights = areas[tris]
+        center = (centroids[tris] * weights[:, None]).sum(axis=0) / weights.sum() if weights.sum() > 0 else centroids[tris].mean(axis=0)
+        radius = np.sqrt(((triCoords[tris] - center) ** 2).sum(axis=2).max())
+        node = {"tris":tris, "center":center, "radius":radius, "areaVec":areaVecs[tris].sum(axis=0), "children":None}
+        if len(tris) > leafSize:
+            # split triangles at median centroid along longest axis
+            triCentroids = centroids[tris]
+            axis = np.argmax(triCentroids.max(axis=0) - triCentroids.min(axis=0))
+            order = np.argsort(triCentroids[:, axis], kind="mergesort")
+            half = len(tris) // 2
+            node["children"] = [buildNode(tris[order[:half]]), buildNode(tris[order[half:]])]
+        return node
+
+    return buildNode(np.arange(len(triCoords)))
+
+
+def getWindingNumbers(triCoords, tree, points, beta=2.0, maxPairs=2**21):
+    """ returns generalized winding number of triangles at each point (~1 inside closed mesh, ~0 outside)
+
+    triCoords -- (T, 3, 3) coordinates of the three verts of each triangle
+    tree      -- triangle cluster hierarchy from 'buildWindingTree'
+    points    -- (N, 3) points to evaluate
+    beta      -- clusters farther than 'beta' times their radius from a point are approximated as a single dipole
+    """
+    windingNumbers = np.zeros(len(points))
+    nodes = [(tree, np.arange(len(points)))]
+    while len(nodes) > 0:
+        node, idxs = nodes.pop()
+        offsets = node["center"] - points[idxs]
+        dists = np.sqrt((offsets ** 2).sum(axis=1))
+        far = dists > beta * node["radius"]
+        # approximate contribution of far clusters with dipole at cluster center
+        if far.any():
+            windingNumbers[idxs[far]] += offsets[far].dot(node["areaVec"]) / (4 * np.pi * dists[far] ** 3)
+        idxs = idxs[~far]
+        if len(idxs) == 0:
+            continue
+        if node["children"] is not None:
+            nodes += [(child, idxs) for child in node["children"]]
+            continue
+        # compute exact solid angle of triangles in leaf cluster for nearby points
+        tris = triCoords[node["tris"]]
+        chunkSize = max(1, maxPairs // len(tris))
+        for c0 in range(0, len(idxs), chunkSize):
+            chunk = idxs[c0:c0 + chunkSize]
+            a, b, c = (tris[None, :, i] - points[chunk, None] for i in range(3))
+            dot = lambda v0, v1: np.einsum("ijk,ijk->ij", v0, v1)
+            la, lb, lc = (np.sqrt(dot(v, v)) for v in (a, b, c))
+            det = dot(a, np.cross(b, c))
+            denom = la * lb * lc + dot(a, b) * lc + dot(b, c) * la + dot(c, a) * lb
+            windingNumbers[chunk] += (2 * np.arctan2(det, denom)).sum(axis=1) / (4 * np.pi)
+    return windingNumbers
+
+
+def getLatticeWindingNumbers(triCoords, origin, step, res, tree=None, maxPoints=2**20):
+    """ returns generalized winding number of triangles at every lattice coordinate (array with shape 'res') """
+    tree = tree or buildWindingTree(triCoords)
+    shape = tuple(int(r) for r in res)
+    numPoints = shape[0] * shape[1] * shape[2]
+    windingNumbers = np.empty(numPoints)
+    for p0 in range(0, numPoints, maxPoints):
+        flatIdxs = np.arange(p0, min(p0 + maxPoints, numPoints))
+        points = origin + np.transpose(np.unravel_index(flatIdxs, shape)) * step
+        windingNumbers[p0:p0 + len(flatIdxs)] = getWindingNumbers(triCoords, tree, points)
+    return windingNumbers.reshape(shape)
+
+
+def getBrickFreqArrays(triData, origin, step, res, axes="xyz", insidenessRayCastDir="HIGH EFFICIENCY", useNormals=False, castDoubleCheckRays=True, brickShell="INSIDE", statusCallback=None, numProcesses=1):
+    """ computes brickFreqMatrix and nearest face intersections for lattice with NumPy scanlines
+
+    returns (brickFreqMatrix, faceIdxs, faceDists, faceAxes, faceOffsets)
+    brickFreqMatrix -- int8 array (1: shell, -1: inside, 0: outside) before adjustment with adjustBFM
+    faceIdxs        -- index of nearest intersected face for shell coordinates (-1 if none)
+    faceDists       -- distance to nearest intersected face
+    faceAxes        -- axis along which nearest face was intersected
+    faceOffsets     -- signed offset along 'faceAxes' from coordinate to nearest face intersection
+
+    numProcesses -- split lattice into slabs cast in this many processes (0 for one per CPU core)
+    """
+    axes = axes.lower()
+    axisNames = "xyz"
+    shape = tuple(int(r) for r in res)
+    # get axes to cast rays along
+    windingNumber = insidenessRayCastDir == "WINDING NUMBER"
+    voteAxes = [] if insidenessRayCastDir == "HIGH EFFICIENCY" or windingNumber else [axisNames.index(a) for a in insidenessRayCastDir.lower()]
+    passAxes = [axisNames.index(a) for a in axisNames if a in axes]
+    rayAxes = sorted(set(passAxes + voteAxes))
+    # cast rays along each axis
+    rayData = {}
+    outsideMatrices = {}
+    numProcesses = getNumProcesses(numProcesses)
+    pool = multiprocessing.get_context("fork").Pool(numProcesses, initializer=initSlabWorker, initargs=(triData,)) if numProcesses > 1 else None
+    try:
+        for i, axis in enumerate(rayAxes):
+            if pool is not None:
+                rayData[axis] = castAxisRaysParallel(pool, numProcesses * 2, axis, origin, step, res)
+            else:
+                rayData[axis] = castAxisRays(triData, axis, origin, step, res)
+            outsideMatrices[axis] = getOutsideMatrix(rayData[axis], useNormals, castDoubleCheckRays)
+            if statusCallback:
+                statusCallback((i + 1) / (len(rayAxes) + 1))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    # for non-HIGH EFFICIENCY methods, coordinates are outside if found outside by at least half the axes
+    if len(voteAxes) > 0:
+        outsideVote = sum(outsideMatrices[a].astype(np.int8) for a in voteAxes) / len(voteAxes) >= 0.5
+    # for WINDING NUMBER method, coordinates are outside if winding number is less than 0.5
+    elif windingNumber:
+        outsideVote = getLatticeWindingNumbers(triData[0], origin, step, res) < 0.5
+
+    brickFreqMatrix = np.zeros(shape, dtype=np.int8)
+    faceIdxs = np.full(shape, -1, dtype=np.int32)
+    faceDists = np.full(shape, np.inf, dtype=np.float32)
+    faceAxes = np.zeros(shape, dtype=np.int8)
+    faceOffsets = np.zeros(shape, dtype=np.float32)
+    for axis in passAxes:
+        data = rayData[axis]
+        inside = ~(outsideMatrices[axis] if len(voteAxes) == 0 and not windingNumber else outsideVote)
+        # last coordinate along axis has no next coordinate to cast rays to
+        lastSlice = [slice(None)] * 3
+        lastSlice[axis] = -1
+        inside[tuple(lastSlice)] = False
+        edgeIntersects = data["firstFace"] != -1
+        # get shell for current and next coordinate along axis
+        if brickShell == "INSIDE":
+            shellCur, shellNext = edgeIntersects & inside, edgeIntersects & ~inside
+        elif brickShell == "OUTSIDE":
+            shellCur, shellNext = edgeIntersects & ~inside, edgeIntersects & inside
+        else:
+            shellCur, shellNext = edgeIntersects, edgeIntersects
+        # shift 'shellNext' and last intersection data to next coordinate along axis
+        curSlice = [slice(None)] * 3
+        nextSlice = [slice(None)] * 3
+        curSlice[axis] = slice(0, -1)
+        nextSlice[axis] = slice(1, None)
+        curSlice, nextSlice = tuple(curSlice), tuple(nextSlice)
+        shellNextShifted = np.zeros(shape, dtype=bool)
+        shellNextShifted[nextSlice] = shellNext[curSlice]
+        lastT = np.full(shape, np.nan, dtype=np.float32)
+        lastT[nextSlice] = data["lastT"][curSlice]
+        lastFace = np.full(shape, -1, dtype=np.int32)
+        lastFace[nextSlice] = data["lastFace"][curSlice]
+        # update brickFreqMatrix values
+        brickFreqMatrix[(brickFreqMatrix == 0) & inside] = -1
+        brickFreqMatrix[shellCur | shellNextShifted] = 1
+        # set or update nearest face to coordinate
+        stepLen = abs(step[axis])
+        for shell, t, faces, sign in ((shellCur, data["firstT"], data["firstFace"], 1), (shellNextShifted, lastT, lastFace, -1)):
+            dists = t * stepLen
+            update = shell & (dists < faceDists)
+            faceDists[update] = dists[update]
+            faceIdxs[update] = faces[update]
+            faceAxes[update] = axis
+            faceOffsets[update] = sign * t[update] * step[axis]
+    return brickFreqMatrix, faceIdxs, faceDists, faceAxes, faceOffsets
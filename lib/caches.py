@@ -19,11 +19,107 @@ Created by Christopher Gearhart
     along with this program.  If not, see <http://www.gnu.org/licenses/>.
 '''
 
+# System imports
+from collections import OrderedDict
+
+
+class BMCache(OrderedDict):
+    """ least recently used cache of brick bmesh lists, limited to approximate memory budget """
+    # approximate bytes used by each bmesh element (including custom data layers)
+    vertBytes = 96
+    edgeBytes = 96
+    faceBytes = 96
+    loopBytes = 64
+
+    def __init__(self, maxBytes=256 * 1024 * 1024):
+        super().__init__()
+        self.maxBytes = maxBytes
+        self.sizes = {}
+        self.numBytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def getBytes(self, bms):
+        if bms is None:
+            return 0
+        numLoops = sum(len(f.loops) for bm in bms for f in bm.faces)
+        return sum(len(bm.verts) * self.vertBytes + len(bm.edges) * self.edgeBytes + len(bm.faces) * self.faceBytes for bm in bms) + numLoops * self.loopBytes
+
+    def get(self, key, default=None):
+        if key not in self:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.move_to_end(key)
+        return self[key]
+
+    def __setitem__(self, key, bms):
+        if key in self:
+            self.numBytes -= self.sizes[key]
+        super().__setitem__(key, bms)
+        self.move_to_end(key)
+        self.sizes[key] = self.getBytes(bms)
+        self.numBytes += self.sizes[key]
+        self.evict()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.numBytes -= self.sizes.pop(key)
+
+    def clear(self):
+        super().clear()
+        self.sizes.clear()
+        self.numBytes = 0
+
+    def setMaxBytes(self, maxBytes):
+        self.maxBytes = maxBytes
+        self.evict()
+
+    def evict(self):
+        """ free least recently used bmeshes until cache fits in memory budget """
+        while self.numBytes > self.maxBytes and len(self) > 1:
+            key, bms = self.popitem(last=False)
+            self.freeItem(bms)
+            self.evictions += 1
+
+    def freeItem(self, bms):
+        for bm in bms or []:
+            bm.free()
+
+    def popitem(self, last=True):
+        key, bms = super().popitem(last=last)
+        self.numBytes -= self.sizes.pop(key)
+        return key, bms
+
+    def getStats(self):
+        return {"entries": len(self), "bytes": self.numBytes, "maxBytes": self.maxBytes, "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class VoxelCache(BMCache):
+    """ least recently used cache of packed voxelizations (see 'packVoxelization'), limited to approximate memory budget """
+
+    def getBytes(self, voxelization):
+        return sum(getattr(item, "nbytes", 0) for item in voxelization)
+
+    def freeItem(self, voxelization):
+        pass
+
+
 # initialize the brick bmesh cache dictionary
-bricker_bm_cache = {}
+bricker_bm_cache = BMCache()
 
 # initialize the source mesh cache dictionary
 bricker_source_mesh_cache = {}
 
 # initialize the BFMCache
 bricker_bfm_cache = {}
+
+# initialize the set of BFMCache ids (or (id, frame) pairs) changed since last pushed to deep cache
+bricker_bfm_dirty = set()
+
+# initialize the source BVH tree cache dictionary
+bricker_bvh_cache = {}
+
+# initialize the voxelization cache (shared by models with identical source geometry and matrix settings; entries are read-only arrays)
+bricker_voxel_cache = VoxelCache()
@@ -27,9 +27,40 @@ from bpy.props import *
 # updater import
 from .. import addon_updater_ops
 
+# Addon imports
+from .caches import bricker_bm_cache, bricker_voxel_cache
+
 class BrickerPreferences(AddonPreferences):
     bl_idname = __package__[:__package__.index(".lib")]
 
+    # matrix calculation preferences
+    matrix_processes = bpy.props.IntProperty(
+        name="Matrix Processes",
+        description="Number of processes used to calculate the brick matrix with the scanline engine (0 for one per CPU core, 1 to disable multiprocessing)",
+        default=1, min=0)
+    voxel_cache_size = bpy.props.IntProperty(
+        name="Voxelization Cache (MB)",
+        description="Approximate memory budget for voxelizations reused by models with identical source geometry (least recently used ones are freed past this size)",
+        default=256, min=1,
+        update=lambda self, context: bricker_voxel_cache.setMaxBytes(self.voxel_cache_size * 1024 * 1024))
+
+    # brick merging preferences
+    merge_processes = bpy.props.IntProperty(
+        name="Merge Processes",
+        description="Number of processes used to test connectivity variations when merging bricks (0 for one per CPU core, 1 to disable multiprocessing)",
+        default=1, min=0)
+
+    # brick mesh cache preferences
+    brick_mesh_cache_size = bpy.props.IntProperty(
+        name="Brick Mesh Cache (MB)",
+        description="Approximate memory budget for cached brick meshes (least recently used meshes are freed past this size)",
+        default=256, min=1,
+        update=lambda self, context: bricker_bm_cache.setMaxBytes(self.brick_mesh_cache_size * 1024 * 1024))
+    use_mesh_library = bpy.props.BoolProperty(
+        name="Use Brick Mesh Library",
+        description="Store generated brick meshes on disk (in the user config directory) and reuse them across sessions and files",
+        default=True)
+
 	# addon updater preferences
     auto_check_update = bpy.props.BoolProperty(
         name = "Auto-check for Update",
@@ -58,6 +89,16 @@ class BrickerPreferences(AddonPreferences):
         layout = self.layout
         col = layout.column(align=True)
         row = col.row(align=True)
+        row.prop(self, "matrix_processes")
+        row.prop(self, "merge_processes")
+        row = col.row(align=True)
+        row.prop(self, "voxel_cache_size")
+        row.prop(self, "brick_mesh_cache_size")
+        stats = bricker_bm_cache.getStats()
+        row = col.row(align=True)
+        row.prop(self, "use_mesh_library")
+        row.operator("bricker.prewarm_mesh_library", icon="FILE_REFRESH")
+        col.label("Cached brick meshes: {entries} ({mb:.1f} MB)   Hits: {hits}   Misses: {misses}   Evictions: {evictions}".format(mb=stats["bytes"] / 1024 / 1024, **stats))
 
         # updater draw function
         addon_updater_ops.update_settings_ui(self,context)
@@ -405,7 +405,7 @@ class ModelSettingsPanel(Panel):
         row.prop(cm, "gap")
         row = col.row(align=True)
         row.prop(cm, "connectThresh")
-        row.active = cm.brickType != "CUSTOM"
+        row.active = cm.brickType != "CUSTOM" and cm.mergeType != "OPTIMAL"
 
         col = layout.column(align=True)
         row = col.row(align=True)
@@ -540,6 +540,11 @@ class BrickTypesPanel(Panel):
                 elif cm.mergeType == "GREEDY":
                     row = col.row(align=True)
                     row.prop(cm, "legalBricksOnly")
+                elif cm.mergeType == "OPTIMAL":
+                    row = col.row(align=True)
+                    row.prop(cm, "mergeTimeLimit")
+                    row = col.row(align=True)
+                    row.prop(cm, "legalBricksOnly")
                 row = col.row(align=True)
                 row.prop(cm, "mergeInconsistentMats")
 
@@ -955,6 +960,15 @@ class AdvancedPanel(Panel):
         row.prop(cm, "useNormals")
         row = col.row(align=True)
         row.prop(cm, "verifyExposure")
+        if cm.brickMatrixEngine == "RAY CAST":
+            row = col.row(align=True)
+            row.prop(cm, "useOctree")
+        row = col.row(align=True)
+        row.label("Matrix Engine:")
+        row = col.row(align=True)
+        row.prop(cm, "brickMatrixEngine", text="")
+        row = col.row(align=True)
+        row.prop(cm, "useNarrowBand")
         if not cm.useAnimation and not (cm.modelCreated or cm.animated):
             row = col.row(align=True)
             row.label("Model Orientation:")
@@ -1005,9 +1019,9 @@ class BrickDetailsPanel(Panel):
         row.prop(cm, "activeKey", text="")
 
         if cm.animated:
-            bricksDict, _ = getBricksDict(dType="ANIM", cm=cm, curFrame=getAnimAdjustedFrame(cm, scn.frame_current))
+            bricksDict, _ = getBricksDict(dType="ANIM", cm=cm, curFrame=getAnimAdjustedFrame(cm, scn.frame_current), readOnly=True)
         elif cm.modelCreated:
-            bricksDict, _ = getBricksDict(cm=cm)
+            bricksDict, _ = getBricksDict(cm=cm, readOnly=True)
         if bricksDict is None:
             layout.label("Matrix not available")
             return
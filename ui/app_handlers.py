@@ -29,8 +29,8 @@ from mathutils import Vector, Euler
 
 # Addon imports
 from ..functions import *
-from ..lib.bricksDict import lightToDeepCache, deepToLightCache, getDictKey
-from ..lib.caches import bricker_bfm_cache
+from ..lib.bricksDict import lightToDeepCache, deepToLightCache, bricksDictIsCached, getDictKey
+from ..lib.caches import bricker_bfm_cache, bricker_bfm_dirty
 from ..buttons.customize.tools import *
 
 
@@ -269,6 +269,7 @@ def clear_bfm_cache(dummy):
         return
     for key in bricker_bfm_cache.keys():
         bricker_bfm_cache[key] = None
+    bricker_bfm_dirty.clear()
 
 
 bpy.app.handlers.load_pre.append(clear_bfm_cache)
@@ -284,8 +285,7 @@ def handle_loading_to_light_cache(scene):
     for cm in bpy.context.scene.cmlist:
         if not (cm.modelCreated or cm.animated):
             continue
-        bricksDict = getBricksDict(cm=cm)[0]
-        if bricksDict is None:
+        if not bricksDictIsCached(cm):
             cm.matrixLost = True
             cm.matrixIsDirty = True
 
@@ -194,7 +194,7 @@ class Bricker_CreatedModels(bpy.types.PropertyGroup):
     shellThickness = IntProperty(
         name="Shell Thickness",
         description="Thickness of the Brick shell",
-        update=dirtyBuild,
+        update=dirtyShellThickness,
         min=1, max=50,
         default=1)
 
@@ -244,9 +244,16 @@ class Bricker_CreatedModels(bpy.types.PropertyGroup):
         name="Merge Type",
         description="Type of algorithm to use for merging bricks together",
         items=[("GREEDY", "Greedy", "Creates fewest amount of bricks possible"),
-               ("RANDOM", "Random", "Merges randomly for realistic build")],
+               ("RANDOM", "Random", "Merges randomly for realistic build"),
+               ("OPTIMAL", "Optimal", "Searches each layer for a tiling with few bricks staggered with the layer below (slower)")],
         update=dirtyBuild,
         default="RANDOM")
+    mergeTimeLimit = FloatProperty(
+        name="Time Limit",
+        description="Seconds spent searching for the best tiling of each layer before finishing it greedily",
+        update=dirtyBuild,
+        min=0, max=60,
+        default=1)
     legalBricksOnly = BoolProperty(
         name="Legal Bricks Only",
         description="Construct model using only legal brick sizes",
@@ -475,7 +482,7 @@ class Bricker_CreatedModels(bpy.types.PropertyGroup):
         items=[("NONE", "None", "No internal supports"),
                ("LATTICE", "Lattice", "Use latice inside model"),
                ("COLUMNS", "Columns", "Use columns inside model")],
-        update=dirtyInternal,
+        update=dirtyInternalSupports,
         default="NONE")
     latticeStep = IntProperty(
         name="Step",
@@ -511,7 +518,8 @@ class Bricker_CreatedModels(bpy.types.PropertyGroup):
                ("X", "X", "Cast rays along X axis for insideness calculations"),
                ("Y", "Y", "Cast rays along Y axis for insideness calculations"),
                ("Z", "Z", "Cast rays along Z axis for insideness calculations"),
-               ("XYZ", "XYZ (Best Result)", "Cast rays in all axis directions for insideness calculation (slowest; uses result consistent for at least 2 of the 3 rays)")],
+               ("XYZ", "XYZ (Best Result)", "Cast rays in all axis directions for insideness calculation (slowest; uses result consistent for at least 2 of the 3 rays)"),
+               ("WINDING NUMBER", "Winding Number", "Calculate insideness of all brick locations at once from the generalized winding number of the source (robust for sources with holes)")],
         update=dirtyMatrix,
         default="HIGH EFFICIENCY")
     castDoubleCheckRays = BoolProperty(
@@ -529,6 +537,23 @@ class Bricker_CreatedModels(bpy.types.PropertyGroup):
         description="Run insideness calculations on every brick location (slower, but may fix issue where row(s)/column(s) of extra bricks are drawn)",
         default=False,
         update=dirtyMatrix)
+    brickMatrixEngine = EnumProperty(
+        name="Matrix Engine",
+        description="Method used to calculate brick shell and insideness from source mesh",
+        items=[("RAY CAST", "Ray Cast", "Cast rays from each lattice location with Blender's ray_cast function"),
+               ("SCANLINE", "Scanline (Fast)", "Intersect whole rows of the lattice with source triangles at once using NumPy (much faster for high resolution models)")],
+        update=dirtyMatrix,
+        default="RAY CAST")
+    useOctree = BoolProperty(
+        name="Octree",
+        description="Classify large blocks of the lattice away from the source surface with a single insideness check each (Ray Cast engine only)",
+        default=False,
+        update=dirtyMatrix)
+    useNarrowBand = BoolProperty(
+        name="Narrow Band",
+        description="Only store brick locations within shell thickness of the source surface when not using internal supports (faster and uses less memory for large models with thin shells)",
+        default=False,
+        update=dirtyMatrix)
     useLocalOrient = BoolProperty(
         name="Use Local Orient",
         description="Generate bricks based on local orientation of source object",
@@ -590,6 +615,7 @@ class Bricker_CreatedModels(bpy.types.PropertyGroup):
     lastStartFrame = IntProperty(default=-1)
     lastStopFrame = IntProperty(default=-1)
     lastSourceMid = StringProperty(default="-1,-1,-1")
+    lastSourceHash = StringProperty(default="")
     lastMaterialType = StringProperty(default="SOURCE")
     lastShellThickness = IntProperty(default=1)
     lastBrickType = StringProperty(default="BRICKS")
@@ -145,6 +145,22 @@ def dirtyInternal(self, context):
     cm.buildIsDirty = True
 
 
+def dirtyInternalSupports(self, context):
+    dirtyInternal(self, context)
+    scn, cm, _ = getActiveContextInfo()
+    # narrow band matrix must be recalculated to store internal locations
+    if cm.useNarrowBand:
+        cm.matrixIsDirty = True
+
+
+def dirtyShellThickness(self, context):
+    dirtyBuild(self, context)
+    scn, cm, _ = getActiveContextInfo()
+    # narrow band matrix only stores locations within shell thickness
+    if cm.useNarrowBand:
+        cm.matrixIsDirty = True
+
+
 def dirtyBuild(self, context):
     scn, cm, _ = getActiveContextInfo()
     cm.buildIsDirty = True
@@ -182,6 +198,7 @@ def getCMProps():
             "maxWidth",
             "maxDepth",
             "mergeType",
+            "mergeTimeLimit",
             "legalBricksOnly",
             "splitModel",
             "internalSupports",
@@ -208,6 +225,9 @@ def getCMProps():
             "useNormals",
             "insidenessRayCastDir",
             "castDoubleCheckRays",
+            "brickMatrixEngine",
+            "useNarrowBand",
+            "useOctree",
             "startFrame",
             "stopFrame",
             "useAnimation",